@@ -1,38 +1,31 @@
+import threading
+
+from utils import read_pdf
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    # The engine's OutlineExtractor, created on first use and shared by every
+    # call; same settings as the process_pdfs command line
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            from outline_extractor import OutlineExtractor
+            _extractor = OutlineExtractor()
+        return _extractor
+
+
 def extract_outline(pdf_path):
-    import PyPDF2
-    import json
-    from collections import defaultdict
-
-    outline = {
-        "title": "",
-        "outline": []
-    }
-
-    # Open the PDF file
-    with open(pdf_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
-        num_pages = len(reader.pages)
-
-        # Extract title and headings
-        for page_number in range(num_pages):
-            page = reader.pages[page_number]
-            text = page.extract_text()
-
-            if page_number == 0:
-                # Assume the title is the first line of the first page
-                outline["title"] = text.splitlines()[0] if text else "Untitled"
-
-            # Process each line to find headings
-            for line in text.splitlines():
-                if line.startswith("# "):  # H1
-                    outline["outline"].append({"level": "H1", "text": line[2:], "page": page_number + 1})
-                elif line.startswith("## "):  # H2
-                    outline["outline"].append({"level": "H2", "text": line[3:], "page": page_number + 1})
-                elif line.startswith("### "):  # H3
-                    outline["outline"].append({"level": "H3", "text": line[4:], "page": page_number + 1})
-
-    return outline
+    # Title and headings of one PDF as {"title", "outline": [{"level", "text", "page"}]}
+    return get_extractor().extract_outline(read_pdf(pdf_path)).to_dict()
+
 
 def save_outline_to_json(outline, output_path):
-    with open(output_path, "w") as json_file:
-        json.dump(outline, json_file, indent=4)
\ No newline at end of file
+    # Written exactly as process_pdfs writes its outputs
+    from outline_model import Outline
+    if isinstance(outline, dict):
+        outline = Outline.from_dict(outline)
+    with open(output_path, "w", encoding="utf-8") as json_file:
+        json_file.write(outline.to_json(indent=4))
@@ -1,16 +1,15 @@
-class Heading:
-    def __init__(self, level: str, text: str, page: int):
-        self.level = level
-        self.text = text
-        self.page = page
+"""Outline types of the extractor.
 
-class Outline:
-    def __init__(self, title: str, headings: list):
-        self.title = title
-        self.headings = headings
+The definitions are the slotted classes of outline_model.py at the
+repository root, shared with process_pdfs, so both tools describe lines,
+headings and outlines the same way.
+"""
+import os
+import sys
 
-    def to_dict(self):
-        return {
-            "title": self.title,
-            "outline": [heading.__dict__ for heading in self.headings]
-        }
\ No newline at end of file
+_ROOT = os.environ.get("PDF_OUTLINE_ENGINE") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from outline_model import Heading, HeadingCandidate, Line, Outline  # noqa: E402,F401
@@ -1,6 +1,53 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# The extraction engine (process_pdfs.py and its modules) lives at the
+# repository root; the Docker image copies it next to src/ and points
+# PDF_OUTLINE_ENGINE at it.
+ENGINE_DIR = os.environ.get("PDF_OUTLINE_ENGINE") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+
+from pdf_input import PdfInput  # noqa: E402
+
+# Documents kept open by read_pdf
+READ_CACHE_SIZE = 8
+
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+
+
 def read_pdf(file_path):
-    # Function to read a PDF file and return its content
-    pass
+    # Function to read a PDF file and return its content: a shared
+    # pdf_input.PdfInput, so the file is read (or memory-mapped) once however
+    # many callers open it. Documents are cached by path, size and mtime, so
+    # a replaced file is read again. Beyond READ_CACHE_SIZE the least
+    # recently used one is dropped from the cache but not closed: callers
+    # may still hold it, and its buffer (or mapping) is released with the
+    # last reference.
+    path = os.path.abspath(os.fspath(file_path))
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _documents_lock:
+        pdf = _documents.get(key)
+        if pdf is not None:
+            _documents.move_to_end(key)
+            return pdf
+    pdf = PdfInput(path)
+    with _documents_lock:
+        # Another thread may have read it meanwhile; keep the first copy
+        if key in _documents:
+            pdf.close()
+            _documents.move_to_end(key)
+            return _documents[key]
+        _documents[key] = pdf
+        while len(_documents) > READ_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return pdf
+
 
 def format_output(title, headings):
     # Function to format the extracted title and headings into the desired JSON structure
@@ -9,6 +56,7 @@ def format_output(title, headings):
         "outline": headings
     }
 
+
 def handle_error(error_message):
     # Function to handle errors and log them appropriately
-    print(f"Error: {error_message}")
\ No newline at end of file
+    print(f"Error: {error_message}")
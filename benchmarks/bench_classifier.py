@@ -0,0 +1,90 @@
+"""Per-line cost of the heading line filters.
+
+Compares the compiled LineClassifier against the per-call re.search/re.match
+filters the extractors used before, over the lines of sample_dataset/pdfs.
+
+    python benchmarks/bench_classifier.py [--repeat N]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from line_classifier import LINE_CLASSIFIER, OBVIOUS_NON_HEADINGS, TABLE_CELL_WORDS, TABLE_WORDS  # noqa: E402
+from process_pdfs import collect_pymupdf_lines  # noqa: E402
+
+
+def legacy_classify(text):
+    # The filters as each extractor ran them: one re call per rule, every line
+    garbled = bool(
+        re.search(r'(\w)\1{3,}', text) or
+        re.search(r'([:;.,!?])\1{2,}', text) or
+        not text.isprintable() or
+        (len(set(text)) < len(text) * 0.3 and len(text) > 10) or
+        re.search(r'([A-Z])\1{3,}', text)
+    )
+    repeated = bool(re.search(r'(\w)\1{2,}', text))
+    depth = (4 if re.match(r'^\d+\.\d+\.\d+\.\d+', text) else
+             3 if re.match(r'^\d+\.\d+\.\d+', text) else
+             2 if re.match(r'^\d+\.\d+', text) else
+             1 if re.match(r'^\d+\.', text) else 0)
+    table = bool(
+        text.lower() in list(TABLE_WORDS) or
+        re.match(r'^table\s+\d+', text.lower()) or
+        re.match(r'^figure\s+\d+', text.lower()) or
+        re.match(r'^chart\s+\d+', text.lower()) or
+        re.match(r'^[\d\.\s]+$', text) or
+        len(re.findall(r'\d+\.\d+', text)) > 3 or
+        len(text.split()) <= 2 and text.lower() in list(TABLE_CELL_WORDS)
+    )
+    date = bool(re.match(r'^\d+/\d+/\d+$', text))
+    page_number = bool(re.match(r'^\d+$', text))
+    stop_word = text.lower() in list(OBVIOUS_NON_HEADINGS)
+    return garbled, repeated, depth, table, date, page_number, stop_word
+
+
+def current_classify(text):
+    c = LINE_CLASSIFIER.classify(text)
+    return c.garbled, c.repeated_letters, c.depth, c.table, c.date, c.page_number, c.stop_word
+
+
+def time_per_line(func, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            func(t)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", default=os.path.join(ROOT, "sample_dataset", "pdfs"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    texts = []
+    for pdf_path in sorted(glob.glob(os.path.join(args.pdfs, "*.pdf"))):
+        lines = collect_pymupdf_lines(pdf_path)
+        texts.extend(lines.text(i) for i in range(len(lines)))
+    if not texts:
+        sys.exit(f"no lines found under {args.pdfs}")
+
+    mismatches = sum(legacy_classify(t) != current_classify(t) for t in texts)
+    legacy = time_per_line(legacy_classify, texts, args.repeat)
+    current = time_per_line(current_classify, texts, args.repeat)
+    print(f"lines:       {len(texts)}")
+    print(f"legacy:      {legacy * 1e6:.2f} us/line")
+    print(f"classifier:  {current * 1e6:.2f} us/line ({legacy / current:.1f}x)")
+    print(f"mismatches:  {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
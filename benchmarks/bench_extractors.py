@@ -0,0 +1,228 @@
+"""Throughput, latency, memory and accuracy of the heading extractors.
+
+Runs each extractor, and automatic backend selection ("auto"), over
+sample_dataset/pdfs and over synthetic documents (see synthetic.py) and
+reports pages/sec, p50/p95 per-document latency, peak RSS and heading
+precision/recall against the expected JSON. Every
+(extractor, dataset) pair runs in a fresh process so peak RSS is its own.
+
+    python benchmarks/bench_extractors.py --save baseline.json
+    python benchmarks/bench_extractors.py --compare baseline.json
+
+--compare exits with status 1 when a result is slower, larger or less
+accurate than the baseline beyond --tolerance, or returns more junk
+headings (no letter or digit, e.g. a rule of dashes) than it did.
+"""
+import argparse
+import collections
+import datetime
+import glob
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+EXTRACTORS = (
+    "extract_heading_structure",
+    "extract_heading_structure_pdfplumber_lines",
+    "extract_heading_structure_pdfminer",
+    "extract_heading_structure_pymupdf",
+    "auto",  # per-document backend selection (process_pdfs.run_backend)
+)
+SYNTHETIC_SIZES = (100, 1000, 5000)
+# Pages of the synthetic document whose "Summary" body heading repeats
+REPEATED_PAGES = 30
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _heading_keys(outline):
+    return [(h["level"], _normalize(h["text"]), h["page"]) for h in outline]
+
+
+def score(documents):
+    """Micro-averaged heading precision/recall and title accuracy. A heading
+    matches when level, whitespace/case-normalized text and page agree."""
+    tp = predicted = expected = titles = 0
+    for doc in documents:
+        want = _heading_keys(doc["expected"]["outline"])
+        got = _heading_keys(doc["outline"]) if doc["ok"] else []
+        remaining = collections.Counter(want)
+        for key in got:
+            if remaining[key]:
+                remaining[key] -= 1
+                tp += 1
+        predicted += len(got)
+        expected += len(want)
+        titles += doc["ok"] and _normalize(doc["title"]) == _normalize(doc["expected"]["title"])
+    return {
+        "precision": tp / predicted if predicted else 0.0,
+        "recall": tp / expected if expected else 0.0,
+        "title_accuracy": titles / len(documents) if documents else 0.0,
+    }
+
+
+def junk(results):
+    """Headings of results without a single letter or digit."""
+    return [f'{r["file"]}: "{h["text"]}"' for r in results for h in r["outline"]
+            if not any(ch.isalnum() for ch in h["text"])]
+
+
+def run_dataset(extractor, documents):
+    # Runs in a fresh child process: [(pdf_path, expected)] -> measurements
+    import fitz
+    import process_pdfs
+    from outline_model import headings_to_dicts
+
+    if extractor == "auto":
+        def func(pdf_path):
+            return process_pdfs.run_backend(pdf_path)[:2]
+    else:
+        func = getattr(process_pdfs, extractor)
+    results = []
+    for pdf_path, expected in documents:
+        with fitz.open(pdf_path) as doc:
+            pages = len(doc)
+        start = time.perf_counter()
+        try:
+            title, outline = func(pdf_path)
+            outline = headings_to_dicts(outline)
+            ok, error = True, None
+        except Exception as e:
+            title, outline, ok, error = "", [], False, f"{type(e).__name__}: {e}"
+        results.append({
+            "file": os.path.basename(pdf_path),
+            "pages": pages,
+            "seconds": time.perf_counter() - start,
+            "ok": ok,
+            "error": error,
+            "title": title,
+            "outline": outline,
+            "expected": expected,
+        })
+    # ru_maxrss is in KiB on Linux
+    return results, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summarize(results, peak_rss):
+    seconds = np.array([r["seconds"] for r in results])
+    pages = sum(r["pages"] for r in results)
+    errors = [f'{r["file"]}: {r["error"]}' for r in results if not r["ok"]]
+    return {
+        "documents": len(results),
+        "pages": pages,
+        "seconds": float(seconds.sum()),
+        "pages_per_sec": pages / seconds.sum() if seconds.sum() else 0.0,
+        "p50_ms": float(np.percentile(seconds, 50) * 1000),
+        "p95_ms": float(np.percentile(seconds, 95) * 1000),
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        "errors": errors,
+        "junk": junk(results),
+        **score(results),
+    }
+
+
+def load_sample(pdf_dir, expected_dir):
+    documents = []
+    for pdf_path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        with open(os.path.join(expected_dir, stem + ".json"), "r", encoding="utf-8") as f:
+            documents.append((pdf_path, json.load(f)))
+    return documents
+
+
+def compare(baseline, current, tolerance):
+    """Regressions of current against baseline, as readable strings."""
+    regressions = []
+    for extractor, datasets in current["results"].items():
+        for name, now in datasets.items():
+            before = baseline.get("results", {}).get(extractor, {}).get(name)
+            if before is None:
+                continue
+            where = f"{extractor} [{name}]"
+            if now["pages_per_sec"] < before["pages_per_sec"] * (1 - tolerance):
+                regressions.append(f'{where}: {now["pages_per_sec"]:.1f} pages/s, was {before["pages_per_sec"]:.1f}')
+            if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f'{where}: p95 {now["p95_ms"]:.0f} ms, was {before["p95_ms"]:.0f}')
+            if now["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f'{where}: peak RSS {now["peak_rss_mb"]:.0f} MB, was {before["peak_rss_mb"]:.0f}')
+            for metric in ("precision", "recall", "title_accuracy"):
+                if now[metric] < before[metric] - 1e-9:
+                    regressions.append(f'{where}: {metric} {now[metric]:.3f}, was {before[metric]:.3f}')
+            was = before.get("junk", [])
+            if len(now["junk"]) > len(was):
+                regressions.append(f'{where}: {len(now["junk"])} junk headings, was {len(was)}: '
+                                   + "; ".join(sorted(set(now["junk"]) - set(was))))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", default=os.path.join(ROOT, "sample_dataset", "pdfs"))
+    parser.add_argument("--expected", default=os.path.join(ROOT, "sample_dataset", "outputs"))
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS),
+                        help="Comma-separated extractor names (default: all)")
+    parser.add_argument("--sizes", default=",".join(map(str, SYNTHETIC_SIZES)),
+                        help="Comma-separated synthetic document page counts; empty for none")
+    parser.add_argument("--no-repeated", dest="repeated", action="store_false",
+                        help="Skip the synthetic document with a body heading repeated on every third page")
+    parser.add_argument("--synthetic-dir", default=os.path.join(tempfile.gettempdir(), "pdf-outline-bench"),
+                        help="Where generated PDFs are kept between runs")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown / memory growth before --compare fails")
+    args = parser.parse_args(argv)
+
+    from synthetic import ensure_pdf
+
+    datasets = {"sample": load_sample(args.pdfs, args.expected)}
+    for pages in (int(s) for s in args.sizes.split(",") if s.strip()):
+        datasets[f"synthetic-{pages}"] = [ensure_pdf(args.synthetic_dir, pages)]
+    if args.repeated:
+        datasets["repeated-heading"] = [ensure_pdf(args.synthetic_dir, REPEATED_PAGES, repeated=True)]
+
+    ctx = mp.get_context("spawn")
+    current = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {},
+    }
+    print(f'{"extractor":<44} {"dataset":<16} {"pages/s":>9} {"p50 ms":>9} {"p95 ms":>9} '
+          f'{"RSS MB":>7} {"prec":>6} {"recall":>6} {"junk":>4} {"err":>4}')
+    for extractor in args.extractors.split(","):
+        for name, documents in datasets.items():
+            with ctx.Pool(1) as pool:
+                results, peak_rss = pool.apply(run_dataset, (extractor, documents))
+            s = summarize(results, peak_rss)
+            current["results"].setdefault(extractor, {})[name] = s
+            print(f'{extractor:<44} {name:<16} {s["pages_per_sec"]:>9.1f} {s["p50_ms"]:>9.0f} {s["p95_ms"]:>9.0f} '
+                  f'{s["peak_rss_mb"]:>7.0f} {s["precision"]:>6.3f} {s["recall"]:>6.3f} {len(s["junk"]):>4} '
+                  f'{len(s["errors"]):>4}')
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=4, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), current, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
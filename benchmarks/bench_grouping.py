@@ -0,0 +1,99 @@
+"""Cost of merging multi-line headings on documents with many candidates.
+
+Compares the vectorized merge (sort, adjacency tests, merge_runs, one join
+per heading) against the dict loop the pymupdf extractor ran before, over
+synthetic candidate lines: headings of one to four lines with jittered
+indents, gaps and sizes, so both the pairwise and the first-line tests
+break runs.
+
+    python benchmarks/bench_grouping.py [--lines N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from line_table import join_runs, merge_runs  # noqa: E402
+
+
+def synthetic_candidates(n, seed=0):
+    rng = np.random.default_rng(seed)
+    per_heading = rng.integers(1, 5, size=n)
+    heading = np.repeat(np.arange(n), per_heading)[:n]
+    first = np.r_[True, heading[1:] != heading[:-1]]
+    page = heading // 20 + 1
+    depth = rng.integers(1, 4, size=n)[heading]
+    # Continuation lines sit close below the line before, headings further apart
+    gap = np.where(first, rng.uniform(10, 60, size=n), rng.uniform(0, 40, size=n))
+    y0 = np.cumsum(gap + 12.0) % 700.0
+    y1 = y0 + 12.0
+    x0 = rng.choice([72.0, 90.0], size=n)[heading] + rng.normal(0, 40, size=n)
+    size = rng.choice([14.0, 12.0, 11.0], size=n)[heading] + rng.normal(0, 1.2, size=n)
+    texts = [f"{d}. Heading {h} line {i}" for i, (d, h) in enumerate(zip(depth.tolist(), heading.tolist()))]
+    return page.astype(np.int32), depth, y0, y1, x0, size, texts
+
+
+def legacy_group(page, depth, y0, y1, x0, size, texts):
+    # The loop as the extractor ran it: one dict per candidate, copied per group
+    candidates = [{"text": t, "size": float(s), "y0": float(a), "y1": float(b), "x0": float(x),
+                   "page": int(p), "level": "H%d" % d}
+                  for t, s, a, b, x, p, d in zip(texts, size, y0, y1, x0, page, depth)]
+    candidates.sort(key=lambda x: (x["page"], x["y0"]))
+    grouped = []
+    prev = None
+    for l in candidates:
+        if (prev and l["level"] == prev["level"] and l["page"] == prev["page"] and
+                abs(l["y0"] - prev["y1"]) < 30 and abs(l["x0"] - prev["x0"]) < 100 and
+                abs(l["size"] - prev["size"]) < 3):
+            prev["text"] += " " + l["text"]
+            prev["y1"] = l["y1"]
+        else:
+            grouped.append(l.copy())
+            prev = grouped[-1]
+    return [(l["level"], l["page"], l["text"]) for l in grouped]
+
+
+def current_group(page, depth, y0, y1, x0, size, texts):
+    order = np.lexsort((y0, page))
+    page, depth, y0, y1, x0, size = (a[order] for a in (page, depth, y0, y1, x0, size))
+    texts = [texts[i] for i in order.tolist()]
+    link = np.zeros(len(page), dtype=bool)
+    link[1:] = (depth[1:] == depth[:-1]) & (page[1:] == page[:-1]) & (np.abs(y0[1:] - y1[:-1]) < 30)
+    starts = merge_runs(link, x0, size, 100, 3)
+    return [("H%d" % d, p, text)
+            for d, p, text in zip(depth[starts].tolist(), page[starts].tolist(), join_runs(starts, texts))]
+
+
+def best_time(func, args, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    candidates = synthetic_candidates(args.lines)
+    legacy, expected = best_time(legacy_group, candidates, args.repeat)
+    current, grouped = best_time(current_group, candidates, args.repeat)
+    print(f"lines:       {args.lines}")
+    print(f"headings:    {len(grouped)}")
+    print(f"legacy:      {legacy * 1e3:.1f} ms")
+    print(f"vectorized:  {current * 1e3:.1f} ms ({legacy / current:.1f}x)")
+    print(f"identical:   {grouped == expected}")
+    return 0 if grouped == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
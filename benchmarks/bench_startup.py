@@ -0,0 +1,87 @@
+"""Cold-start cost of process_pdfs.
+
+Reports the slowest imports of process_pdfs (from python -X importtime) and
+the time from process start to the first output line when process_pdfs.py
+converts a one-page PDF, against a bare interpreter start.
+
+    python benchmarks/bench_startup.py [--repeat N] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """[(self_us, cumulative_us, name)] for every import made by module."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def time_to_first_output(argv, cwd, marker=""):
+    """Seconds from spawning argv to its first stdout line starting with
+    marker, and to its exit."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(argv, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if line.startswith(marker):
+            break
+    first = time.perf_counter() - start
+    proc.communicate()
+    return first, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from synthetic import make_pdf
+
+    rows = import_times("process_pdfs")
+    total = next(c for _, c, name in rows if name == "process_pdfs")
+    print(f"import process_pdfs: {total / 1000:.1f} ms")
+    print(f'{"self ms":>9} {"cumul ms":>9}  module')
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}")
+    loaded = {name for _, _, name in rows}
+    print("backends imported: " + (", ".join(m for m in ("fitz", "pymupdf", "pdfplumber", "pdfminer")
+                                            if m in loaded) or "none"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_dir = os.path.join(tmp, "in")
+        os.makedirs(in_dir)
+        make_pdf(os.path.join(in_dir, "one_page.pdf"), 1)
+        run = [sys.executable, os.path.join(ROOT, "process_pdfs.py"),
+               "--input", in_dir, "--output", os.path.join(tmp, "out"), "--no-cache"]
+        bare = [sys.executable, "-c", "print()"]
+        results = {"interpreter": [], "process_pdfs": []}
+        for _ in range(args.repeat):
+            results["interpreter"].append(time_to_first_output(bare, ROOT))
+            # Skip library warnings printed before the result line
+            results["process_pdfs"].append(time_to_first_output(run, ROOT, "✅"))
+
+    print(f"\none-page PDF, {args.repeat} runs (median)")
+    for name, runs in results.items():
+        first = statistics.median(r[0] for r in runs)
+        end = statistics.median(r[1] for r in runs)
+        print(f"{name:<14} first output {first * 1000:>7.1f} ms   exit {end * 1000:>7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Synthetic PDFs of arbitrary length with a known outline.
+
+Every third page opens a numbered section ("12. Section 12 Overview", H1)
+and every page carries one numbered subsection ("12.2 Subsection on topic
+35", H2), followed by filler text, a running header and a page number.
+The expected outline uses the page numbering of sample_dataset/outputs
+(physical page - 1, at least 1). With repeated=True the last page of
+every section also carries an unnumbered "Summary" heading in the body,
+the same text on every third page, which header/footer detection must
+not mistake for running text.
+
+    python benchmarks/synthetic.py PAGES OUT.pdf [--repeated]
+"""
+import json
+import os
+import random
+import sys
+
+import fitz
+
+TITLE = "Synthetic Benchmark Document"
+WORDS = ["alpha", "beta", "gamma", "delta", "data", "model", "result", "value"]
+
+
+def make_pdf(path, pages, seed=1, repeated=False):
+    """Write a synthetic PDF to path and return its expected output."""
+    rng = random.Random(seed)
+    outline = []
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        out_page = max(1, i)
+        y = 60
+        if i == 0:
+            page.insert_text((150, 100), TITLE, fontsize=22, fontname="hebo")
+            y = 150
+        page.insert_text((50, 30), "Running header - page %d" % (i + 1), fontsize=8)
+        section = i // 3 + 1
+        if i % 3 == 0:
+            text = "%d. Section %d Overview" % (section, section)
+            page.insert_text((50, y), text, fontsize=16, fontname="hebo")
+            outline.append({"level": "H1", "text": text, "page": out_page})
+            y += 30
+        text = "%d.%d Subsection on topic %d" % (section, i % 3 + 1, i)
+        page.insert_text((50, y), text, fontsize=13, fontname="hebo")
+        outline.append({"level": "H2", "text": text, "page": out_page})
+        y += 24
+        summary = repeated and i % 3 == 2
+        while y < 760:
+            if summary and y >= 400:
+                # Mid-page, well clear of the header/footer margins
+                page.insert_text((50, y + 6), "Summary", fontsize=16, fontname="hebo")
+                outline.append({"level": "H1", "text": "Summary", "page": out_page})
+                summary = False
+                y += 30
+            page.insert_text((50, y), " ".join(rng.choice(WORDS) for _ in range(12)), fontsize=10)
+            y += 14
+        page.insert_text((290, 810), str(i + 1), fontsize=8)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return {"title": TITLE, "outline": outline}
+
+
+def ensure_pdf(directory, pages, seed=1, repeated=False):
+    """Return (pdf_path, expected) for a synthetic document, generating it
+    into directory only if it is not there yet."""
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, "synthetic_%dp_s%d%s" % (pages, seed, "_rep" if repeated else ""))
+    pdf_path, expected_path = stem + ".pdf", stem + ".json"
+    if os.path.exists(pdf_path) and os.path.exists(expected_path):
+        with open(expected_path, "r", encoding="utf-8") as f:
+            return pdf_path, json.load(f)
+    expected = make_pdf(pdf_path, pages, seed, repeated)
+    with open(expected_path, "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=4, ensure_ascii=False)
+    return pdf_path, expected
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--repeated"]
+    if len(args) != 2:
+        sys.exit("usage: " + __doc__.strip().splitlines()[-1].strip())
+    make_pdf(args[1], int(args[0]), repeated="--repeated" in sys.argv[1:])
@@ -0,0 +1,102 @@
+import datetime
+import io
+import json
+import os
+
+# Rotate bundles at this many uncompressed bytes or records, whichever first
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_RECORDS = 100000
+BUFFER_SIZE = 1024 * 1024
+
+SUFFIX = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def check_compression(compression):
+    """Raise ValueError if the compression is unknown or its module missing."""
+    if compression not in SUFFIX:
+        raise ValueError(f"unknown compression {compression!r}")
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ValueError("zstd compression needs the 'zstandard' package")
+
+
+class BundleWriter:
+    """Streams output records as JSON Lines into rotated bundle files.
+
+    Records go through a large write buffer (and the compressor, if any) to
+    <prefix>-<UTC time>-<run id>-<seq>.jsonl[.gz|.zst]. A bundle is written
+    as .part, flushed, fsynced once and renamed when it is rotated or the
+    writer closes, so readers never see a partial bundle and the
+    filesystem sees one fsync per bundle instead of one per document. The
+    random run id keeps writers started in the same second (two runs, or
+    two shards) from sharing names; the .part file is created exclusively,
+    so a collision fails instead of overwriting another writer's bundle.
+    """
+
+    def __init__(self, directory, prefix="outlines", compression=None,
+                 max_bytes=DEFAULT_MAX_BYTES, max_records=DEFAULT_MAX_RECORDS):
+        check_compression(compression)
+        self.directory = directory
+        self.prefix = prefix
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.run_id = os.urandom(4).hex()
+        self.seq = 0
+        self.path = None
+        self._raw = None
+        self._stream = None
+        self._bytes = 0
+        self._records = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        self.seq += 1
+        name = f"{self.prefix}-{self.stamp}-{self.run_id}-{self.seq:05d}{SUFFIX[self.compression]}"
+        self.path = os.path.join(self.directory, name)
+        self._raw = io.BufferedWriter(io.FileIO(self.path + ".part", "x"), BUFFER_SIZE)
+        if self.compression == "gzip":
+            import gzip
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        elif self.compression == "zstd":
+            import zstandard
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+        self._bytes = 0
+        self._records = 0
+
+    def write(self, record):
+        """Append one record; returns the final path of its bundle."""
+        if self._stream is None:
+            self._open()
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._stream.write(line)
+        self._bytes += len(line)
+        self._records += 1
+        path = self.path
+        if self._bytes >= self.max_bytes or self._records >= self.max_records:
+            self._finish()
+        return path
+
+    def _finish(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self.path + ".part", self.path)
+        self._raw = self._stream = None
+
+    def close(self):
+        if self._stream is not None:
+            self._finish()
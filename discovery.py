@@ -0,0 +1,73 @@
+import fnmatch
+import hashlib
+import os
+
+DEFAULT_INCLUDE = ("*.pdf",)
+
+
+def parse_shard(value):
+    """Parse "i/N" (0 <= i < N) into (i, N)."""
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in [0, N), got {value!r}")
+    return index, count
+
+
+def in_shard(rel_path, shard):
+    """Whether rel_path belongs to shard (i, N). The hash is stable across
+    machines and runs, so nodes can split one tree without a coordinator."""
+    if shard is None:
+        return True
+    index, count = shard
+    h = hashlib.blake2b(rel_path.encode("utf-8", "surrogateescape"), digest_size=8).digest()
+    return int.from_bytes(h, "big") % count == index
+
+
+def _matches(rel_path, name, patterns):
+    # Patterns containing "/" match the whole relative path, others the name;
+    # matching is case-insensitive ("*.pdf" also finds "REPORT.PDF")
+    for pattern in patterns:
+        target = rel_path if "/" in pattern else name
+        if fnmatch.fnmatchcase(target.lower(), pattern.lower()):
+            return True
+    return False
+
+
+def discover(root, include=DEFAULT_INCLUDE, exclude=(), shard=None):
+    """Yield (rel_path, path) of matching files under root, depth first.
+
+    rel_path uses "/" separators. Directories are read one at a time with
+    os.scandir and files are yielded as the listing is read, so the first
+    file comes out without waiting for a large directory to be listed.
+    Only the pending subdirectory names are held. Files come in the order
+    the filesystem lists them, which need not be sorted; nothing downstream
+    depends on it (outputs mirror rel_path and shards hash it). Excluded
+    directories are not descended into; directory symlinks are not followed.
+    """
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as it:
+                for entry in it:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not _matches(rel_path, entry.name, exclude):
+                            subdirs.append(rel_path)
+                        continue
+                    if (_matches(rel_path, entry.name, include) and not _matches(rel_path, entry.name, exclude)
+                            and in_shard(rel_path, shard) and entry.is_file()):
+                        yield rel_path, entry.path
+        except OSError:
+            # Unreadable directory, or one that failed while being listed
+            pass
+        # Files of a directory come before its subdirectories
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,112 @@
+import re
+
+import numpy as np
+
+# Top and bottom fraction of the page height where running lines live
+MARGIN = 0.12
+# Vertical positions are compared in bands of this many points
+BAND = 4.0
+# A margin line is running once it is found on this many pages
+MIN_PAGES = 3
+
+_DIGITS = re.compile(r"\d+")
+# "2.1 Scope": the numbers are what tells consecutive headings apart
+_SECTION_NUMBER = re.compile(r"\d+(?:\.\d+)*\.?\s+[^\W\d_]")
+
+
+def fingerprint(text):
+    """Case- and space-normalized text with digit runs masked, so "Page 3
+    of 10" and "Page 4 of 10" share a fingerprint. Lines that open with a
+    section number keep their digits."""
+    text = " ".join(text.lower().split())
+    if _SECTION_NUMBER.match(text):
+        return text
+    return _DIGITS.sub("#", text)
+
+
+class HeaderFooterIndex:
+    """Running headers and footers, found by positional fingerprint.
+
+    A line in the top or bottom margin is keyed by its fingerprint, the
+    margin it is in and its distance from that page edge in BAND-point
+    bands; a key seen on MIN_PAGES distinct pages marks a running line.
+    The index only keeps a page count per key, so it can be fed a document
+    one page at a time. y_up is set for coordinates measured from the
+    bottom of the page (pdfminer).
+    """
+
+    def __init__(self, min_pages=MIN_PAGES, y_up=False):
+        self.min_pages = min_pages
+        self.y_up = y_up
+        self._key_ids = {}
+        self._pages = []
+        self._last_page = []
+
+    def _keys(self, lines):
+        # Margin rows of lines and the key id of each
+        rows, keys = [], []
+        if not len(lines) or not lines.page_heights:
+            return np.array(rows, dtype=np.int64), np.array(keys, dtype=np.int64)
+        height = np.array([lines.page_heights.get(p, 0.0) for p in range(int(lines.page.max()) + 1)])[lines.page]
+        if self.y_up:
+            top, bottom = height - lines.y1, lines.y0
+        else:
+            top, bottom = lines.y0, height - lines.y1
+        margin = MARGIN * height
+        in_top = (top < margin) & (height > 0)
+        in_bottom = (bottom < margin) & (height > 0) & ~in_top
+        fingerprints = {}
+        for i in np.flatnonzero(in_top | in_bottom).tolist():
+            text_id = lines.text_id[i]
+            fp = fingerprints.get(text_id)
+            if fp is None:
+                fp = fingerprints[text_id] = fingerprint(lines.texts[text_id])
+            edge = "top" if in_top[i] else "bottom"
+            band = int(round((top[i] if in_top[i] else bottom[i]) / BAND))
+            key_id = self._key_ids.setdefault((fp, edge, band), len(self._key_ids))
+            if key_id == len(self._pages):
+                self._pages.append(0)
+                self._last_page.append(-1)
+            rows.append(i)
+            keys.append(key_id)
+        return np.array(rows, dtype=np.int64), np.array(keys, dtype=np.int64)
+
+    def _count(self, lines, rows, keys):
+        # Count the pages of every key; returns each row's count so far
+        counts = []
+        for i, key_id in zip(rows.tolist(), keys.tolist()):
+            page = int(lines.page[i])
+            if self._last_page[key_id] != page:
+                self._last_page[key_id] = page
+                self._pages[key_id] += 1
+            counts.append(self._pages[key_id])
+        return np.array(counts, dtype=np.int64)
+
+    def feed(self, lines):
+        """Add whole pages, in page order; returns the mask of their rows
+        that are running lines given the pages seen so far (a line is
+        marked from the MIN_PAGES-th page it appears on)."""
+        mask = np.zeros(len(lines), dtype=bool)
+        rows, keys = self._keys(lines)
+        mask[rows] = self._count(lines, rows, keys) >= self.min_pages
+        return mask
+
+    def add(self, lines):
+        """Add whole pages, in page order, deciding nothing yet; returns
+        the key id of every row (-1 outside the margins) for running() to
+        judge once the rest of the document has been added."""
+        keys = np.full(len(lines), -1, dtype=np.int64)
+        rows, row_keys = self._keys(lines)
+        self._count(lines, rows, row_keys)
+        keys[rows] = row_keys
+        return keys
+
+    def running(self, keys):
+        """Mask of the key ids from add() that are running lines given
+        every page added so far; after the last page this marks every
+        occurrence of a running line, including those on the first pages."""
+        keys = np.asarray(keys, dtype=np.int64)
+        mask = keys >= 0
+        mask[mask] = np.array(self._pages, dtype=np.int64)[keys[mask]] >= self.min_pages
+        return mask
+
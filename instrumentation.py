@@ -0,0 +1,127 @@
+import contextlib
+import json
+import time
+
+
+class _Stage:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Wall time per stage and per page plus event counters of one extraction.
+
+    Stages accumulate, so a stage entered once per page reports its total.
+    Pass NULL_METRICS (the default everywhere) to turn all of it into no-ops.
+    """
+
+    enabled = True
+
+    def __init__(self, name=""):
+        self.name = name
+        self.stages = {}
+        self.pages = []
+        self.counters = {}
+        self.info = {}
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def set_info(self, name, value):
+        self.info[name] = value
+
+    def page(self, page, seconds, lines):
+        self.pages.append({"page": page, "seconds": seconds, "lines": lines})
+
+    def to_dict(self):
+        return {
+            "file": self.name,
+            **self.info,
+            "total_seconds": sum(self.stages.values()),
+            "stages": self.stages,
+            "counters": self.counters,
+            "pages": self.pages,
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, labelled by file."""
+        base = f'file="{_escape(self.name)}"'
+        out = []
+        if self.info:
+            labels = "".join(f',{k}="{_escape(v)}"' for k, v in self.info.items())
+            out += [
+                "# HELP pdf_outline_info Backend chosen for the file and why.",
+                "# TYPE pdf_outline_info gauge",
+                f"pdf_outline_info{{{base}{labels}}} 1",
+            ]
+        out += [
+            "# HELP pdf_outline_stage_seconds Wall time spent in each extraction stage.",
+            "# TYPE pdf_outline_stage_seconds gauge",
+        ]
+        for stage, seconds in self.stages.items():
+            out.append(f'pdf_outline_stage_seconds{{{base},stage="{_escape(stage)}"}} {seconds:.6f}')
+        out += [
+            "# HELP pdf_outline_page_seconds Wall time spent reading each page.",
+            "# TYPE pdf_outline_page_seconds gauge",
+        ]
+        for p in self.pages:
+            out.append(f'pdf_outline_page_seconds{{{base},page="{p["page"]}"}} {p["seconds"]:.6f}')
+        out += [
+            "# HELP pdf_outline_events_total Lines, candidates and filter decisions.",
+            "# TYPE pdf_outline_events_total counter",
+        ]
+        for name, value in self.counters.items():
+            out.append(f'pdf_outline_events_total{{{base},event="{_escape(name)}"}} {value}')
+        return "\n".join(out) + "\n"
+
+    def write(self, path, fmt="json"):
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "prom":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+
+
+class _NullMetrics:
+    enabled = False
+
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def add_time(self, stage, seconds):
+        pass
+
+    def set_info(self, name, value):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def page(self, page, seconds, lines):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+# Sidecar file suffix per --metrics format
+SIDECAR_SUFFIX = {"json": ".metrics.json", "prom": ".prom"}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,294 @@
+"""Compact, memory-mappable layout files.
+
+A layout file holds every text span of a PDF (text, bbox, size, font and
+flags, plus the line it belongs to) in a binary columnar layout, so the
+heading heuristics can be re-run over a corpus without opening any PDF:
+
+    python layout_file.py build --input pdfs/ --output layouts/
+    python layout_file.py outline --input layouts/ --output outlines/ --backend pymupdf
+
+File layout (little endian):
+
+    b"PDFLAYT1"  magic
+    uint64       length of the JSON header
+    header       {"version", "pages", "heights", "rows", "strings", "fonts", "columns"}
+    columns      one array per column, each aligned to 8 bytes; "columns"
+                 maps the name to [offset, dtype, length], offsets counted
+                 from the 8-byte boundary after the header
+
+Rows are spans in page and reading order. page_start[p] is the first row
+of page p (0-based), text_id indexes the unique span texts, whose UTF-8
+bytes are string_data[string_offset[i]:string_offset[i + 1]].
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from line_table import LineTable
+
+MAGIC = b"PDFLAYT1"
+LAYOUT_VERSION = 2
+LAYOUT_SUFFIX = ".layout"
+
+COLUMNS = (
+    ("page", "<i4"),
+    ("line", "<i4"),
+    ("size", "<f8"),
+    ("x0", "<f8"),
+    ("y0", "<f8"),
+    ("x1", "<f8"),
+    ("y1", "<f8"),
+    ("flags", "<i4"),
+    ("font_id", "<i4"),
+    ("text_id", "<i4"),
+)
+
+
+def text_page(page):
+    """MuPDF text page of a fitz page, without image blocks.
+
+    With the default flags MuPDF encodes the pixels of every image on the
+    page into get_text("dict"), which the heuristics throw away; on
+    image-heavy documents that is most of the extraction time.
+    """
+    import fitz
+    return page.get_textpage(flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
+
+
+def page_blocks(page, textpage=None):
+    """Blocks of page.get_text("dict"), from textpage if one was built."""
+    return page.get_text("dict", textpage=textpage or text_page(page))["blocks"]
+
+
+def write_layout(pdf_path, path):
+    """Extract the spans of pdf_path once and write them as a layout file."""
+    from pdf_input import as_input
+    columns = {name: [] for name, _ in COLUMNS}
+    fonts, font_index = [], {}
+    texts, text_index = [], {}
+    page_start = [0]
+    heights = []
+    line_id = 0
+    with as_input(pdf_path).open_fitz() as doc:
+        for page_num, page in enumerate(doc, start=1):
+            heights.append(page.rect.height)
+            for block in page_blocks(page):
+                if block["type"] != 0:
+                    continue
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        font_id = font_index.setdefault(span["font"], len(font_index))
+                        if font_id == len(fonts):
+                            fonts.append(span["font"])
+                        text_id = text_index.setdefault(span["text"], len(text_index))
+                        if text_id == len(texts):
+                            texts.append(span["text"])
+                        x0, y0, x1, y1 = span["bbox"]
+                        for name, value in (("page", page_num), ("line", line_id), ("size", span["size"]),
+                                            ("x0", x0), ("y0", y0), ("x1", x1), ("y1", y1),
+                                            ("flags", span["flags"]), ("font_id", font_id),
+                                            ("text_id", text_id)):
+                            columns[name].append(value)
+                    line_id += 1
+            page_start.append(len(columns["page"]))
+
+    encoded = [t.encode("utf-8", "surrogatepass") for t in texts]
+    arrays = [(name, np.array(columns[name], dtype=dtype)) for name, dtype in COLUMNS]
+    arrays.append(("page_start", np.array(page_start, dtype="<i8")))
+    arrays.append(("string_offset", np.cumsum([0] + [len(b) for b in encoded], dtype="<i8")))
+    arrays.append(("string_data", np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+    _write(path, {
+        "version": LAYOUT_VERSION,
+        "pages": len(page_start) - 1,
+        "heights": heights,
+        "rows": len(columns["page"]),
+        "strings": len(texts),
+        "fonts": fonts,
+    }, arrays)
+
+
+def _write(path, header, arrays):
+    from temp_file import mkstemp_shared
+    layout = {}
+    offset = 0
+    for name, array in arrays:
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset = _align(offset + array.nbytes)
+    header["columns"] = layout
+    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(blob))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = mkstemp_shared(directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(blob)) + blob)
+            for name, array in arrays:
+                f.write(b"\0" * (data_start + layout[name][0] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class LayoutFile:
+    """Read-only view of a layout file.
+
+    The file is memory-mapped and every column is a NumPy array over the
+    mapping, so opening is O(1) and only the pages that are read are paged
+    in. Span texts are decoded once, on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path}: not a layout file")
+        (length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._map[start:start + length].decode("utf-8"))
+        data_start = _align(start + length)
+        if header.get("version") != LAYOUT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path}: unsupported layout version {header.get('version')}")
+        self.pages = header["pages"]
+        self.page_heights = {page: height for page, height in enumerate(header["heights"], start=1)}
+        self.fonts = header["fonts"]
+        for name, (offset, dtype, count) in header["columns"].items():
+            setattr(self, name, np.frombuffer(self._map, dtype=dtype, count=count, offset=data_start + offset))
+        self._texts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Drop the array views first; the mapping cannot close while exported
+        for name, _ in COLUMNS + (("page_start", None), ("string_offset", None), ("string_data", None)):
+            self.__dict__.pop(name, None)
+        self._map.close()
+
+    def __len__(self):
+        return len(self.page)
+
+    @property
+    def texts(self):
+        if self._texts is None:
+            data = self.string_data.tobytes()
+            offsets = self.string_offset.tolist()
+            self._texts = [sys.intern(data[a:b].decode("utf-8", "surrogatepass"))
+                           for a, b in zip(offsets[:-1], offsets[1:])]
+        return self._texts
+
+    def spans(self):
+        """Every span as a LineTable; texts are stripped, and spans that are
+        empty after stripping are dropped."""
+        stripped = [t.strip() for t in self.texts]
+        index = {}
+        remap = np.array([index.setdefault(t, len(index)) for t in stripped], dtype=np.int32)
+        nonempty = np.array([bool(t) for t in stripped], dtype=bool)
+        keep = np.flatnonzero(nonempty[self.text_id]) if len(stripped) else np.zeros(0, dtype=np.int64)
+        return LineTable(
+            self.size[keep].astype(np.float64), self.x0[keep].astype(np.float64),
+            self.x1[keep].astype(np.float64), self.y0[keep].astype(np.float64),
+            self.y1[keep].astype(np.float64), self.page[keep].astype(np.int32),
+            self.flags[keep].astype(np.int32), self.font_id[keep].astype(np.int32),
+            remap[self.text_id[keep]] if len(stripped) else np.zeros(0, dtype=np.int32),
+            list(self.fonts), list(index), self.page_heights,
+        )
+
+    def lines(self, start=0, stop=None):
+        """Merged text lines of pages [start, stop) as a LineTable, exactly
+        as the pymupdf extractor builds them: span texts joined and
+        stripped, largest size, first font, union bbox, OR of flags."""
+        stop = self.pages if stop is None else min(stop, self.pages)
+        a, b = int(self.page_start[start]), int(self.page_start[max(start, stop)])
+        line = self.line[a:b]
+        if not len(line):
+            return LineTable(*(np.zeros(0, dtype) for dtype in (np.float64,) * 5 + (np.int32,) * 4), [], [],
+                             self.page_heights)
+        bounds = np.flatnonzero(np.r_[True, line[1:] != line[:-1]])
+        texts = self.texts
+        text_id = self.text_id[a:b].tolist()
+        ends = bounds[1:].tolist() + [len(line)]
+        merged = ["".join(texts[t] for t in text_id[s:e]).strip() for s, e in zip(bounds.tolist(), ends)]
+        keep = np.array([bool(t) for t in merged], dtype=bool)
+        index = {}
+        ids = np.array([index.setdefault(t, len(index)) for t, k in zip(merged, keep) if k], dtype=np.int32)
+
+        def reduce(column, ufunc):
+            return ufunc.reduceat(column[a:b], bounds)[keep]
+
+        return LineTable(
+            reduce(self.size, np.maximum).astype(np.float64),
+            reduce(self.x0, np.minimum).astype(np.float64),
+            reduce(self.x1, np.maximum).astype(np.float64),
+            reduce(self.y0, np.minimum).astype(np.float64),
+            reduce(self.y1, np.maximum).astype(np.float64),
+            self.page[a:b][bounds][keep].astype(np.int32),
+            reduce(self.flags, np.bitwise_or).astype(np.int32),
+            self.font_id[a:b][bounds][keep].astype(np.int32),
+            ids,
+            list(self.fonts),
+            list(index),
+            self.page_heights,
+        )
+
+    def iter_pages(self):
+        """Yield the merged lines of one page at a time."""
+        for page in range(self.pages):
+            yield self.lines(page, page + 1)
+
+
+def layout_path(directory, rel_path):
+    return os.path.join(directory, os.path.splitext(rel_path)[0] + LAYOUT_SUFFIX)
+
+
+def main(argv=None):
+    import argparse
+    from discovery import discover
+    parser = argparse.ArgumentParser(description="Build layout files, or run heuristics over them")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="extract PDFs under --input into layout files under --output")
+    build.add_argument("--input", required=True)
+    build.add_argument("--output", required=True)
+    outline = sub.add_parser("outline", help="write outline JSONs from layout files, without the PDFs")
+    outline.add_argument("--input", required=True)
+    outline.add_argument("--output", required=True)
+    outline.add_argument("--backend", choices=["pymupdf", "spans"], default="pymupdf")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        for rel_path, pdf_path in discover(args.input):
+            out_path = layout_path(args.output, rel_path)
+            write_layout(pdf_path, out_path)
+            print(f"✅ {rel_path} -> {out_path}")
+        return
+    from process_pdfs import extract_heading_structure_layout, write_output
+    for rel_path, path in discover(args.input, ("*" + LAYOUT_SUFFIX,)):
+        title, outline = extract_heading_structure_layout(path, args.backend)
+        out_path = os.path.join(args.output, rel_path[:-len(LAYOUT_SUFFIX)] + ".json")
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        write_output(out_path, title, outline)
+        print(f"✅ {rel_path} -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import collections
+import re
+
+# Lines that are never headings on their own
+OBVIOUS_NON_HEADINGS = frozenset([
+    'page', 'of', 'continued', '...', 'copyright', 'version', 'may', 'june', 'july', 'august',
+    'september', 'october', 'november', 'december'
+])
+
+# Table/figure captions and column headers
+TABLE_WORDS = frozenset([
+    'table', 'figure', 'chart', 'graph', 'diagram', 'caption', 'header', 'footer', 'date', 'remarks',
+    'version', 'description', 'notes', 'comments', 'status', 'type', 'category', 'group', 'section',
+    'item', 'entry', 'field', 'column', 'row'
+])
+
+# Single-word table cells (checked for lines of at most two words)
+TABLE_CELL_WORDS = frozenset([
+    'yes', 'no', 'true', 'false', 'n/a', 'total', 'sum', 'avg', 'min', 'max', 'date', 'time', 'name',
+    'id', 'code', 'ref', 'num', 'qty', 'amt', 'val', 'key', 'tag', 'label', 'title', 'desc', 'info',
+    'data', 'text', 'note', 'msg', 'err', 'warn', 'ok', 'done', 'new', 'old', 'high', 'low', 'big',
+    'small', 'long', 'short', 'wide', 'narrow', 'fast', 'slow', 'good', 'bad', 'hot', 'cold', 'wet',
+    'dry', 'full', 'empty', 'open', 'closed', 'on', 'off', 'in', 'out', 'up', 'down', 'left', 'right',
+    'top', 'bottom', 'front', 'back', 'start', 'end', 'begin', 'stop', 'go', 'run', 'wait', 'hold',
+    'keep', 'save', 'load', 'send', 'get', 'put', 'add', 'del', 'set', 'use', 'see', 'show', 'hide',
+    'find', 'search', 'sort', 'filter', 'copy', 'paste', 'cut', 'undo', 'redo', 'next', 'prev',
+    'first', 'last', 'best', 'worst', 'easy', 'hard', 'safe', 'risk', 'free', 'paid', 'public',
+    'private', 'local', 'global', 'main', 'sub', 'base', 'core', 'test', 'demo', 'beta', 'alpha',
+    'final', 'draft', 'temp', 'perm', 'auto', 'manual', 'user', 'admin', 'guest', 'host', 'client',
+    'server', 'node', 'link', 'path', 'file', 'dir', 'folder', 'doc', 'pdf', 'txt', 'img', 'pic',
+    'icon', 'logo', 'btn', 'tab', 'menu', 'list', 'grid', 'form', 'page', 'view', 'screen', 'window',
+    'panel', 'box', 'card', 'item', 'unit', 'part', 'piece', 'bit', 'byte', 'word', 'line', 'char', 'cell',
+    'pixel', 'point', 'dot', 'bar', 'area', 'pie', 'map', 'tree', 'graph', 'edge', 'route', 'way',
+    'road', 'street', 'city', 'state', 'country', 'world', 'earth', 'sun', 'moon', 'star', 'planet',
+    'space', 'day', 'night', 'year', 'month', 'week', 'hour', 'sec', 'ms', 'us', 'ns', 'ps', 'fs',
+    'as', 'zs', 'ys'
+])
+
+# Anchored at the start of the line; the alternatives are mutually exclusive
+_PREFIX = re.compile(r'''
+    (?P<date>\d+/\d+/\d+$)
+  | (?P<page>\d+$)
+  | (?P<caption>(?:table|figure|chart)\s+\d+)
+  | (?P<num>\d+(?:\.\d+)*)(?P<dot>\.)?(?P<space>\ )?
+''', re.X | re.I)
+
+# Runs of one word character (3+ repeated letters, 4+ garbled) or of punctuation
+_RUNS = re.compile(r'(\w)\1{2,}|([:;.,!?])\2{2,}')
+
+_NUMERIC_CELL = re.compile(r'^[\d\.\s]+$')
+_DECIMAL = re.compile(r'\d+\.\d+')
+
+LineClass = collections.namedtuple("LineClass", [
+    "garbled",           # corrupted text: long character runs, unprintable, low variety
+    "repeated_letters",  # any word character repeated 3+ times in a row
+    "depth",             # numbering depth: "1." -> 1, "1.2" -> 2 ... capped at 4; 0 if unnumbered
+    "depth_spaced",      # same, but the number must be followed by a space ("1 ", "1. ", "1.2 ")
+    "table",             # table/figure caption, column header or cell content
+    "date",              # 12/05/2024
+    "page_number",       # bare number
+    "stop_word",         # words like "page", "continued", month names
+])
+
+
+class LineClassifier:
+    """Classifies a line of text for the heading filters in one pass.
+
+    All patterns are compiled once at import time and the stop-lists are
+    frozensets, so classifying a line costs one anchored prefix match plus
+    one scan for character runs.
+    """
+
+    def __init__(self, stop_words=OBVIOUS_NON_HEADINGS, table_words=TABLE_WORDS,
+                 table_cell_words=TABLE_CELL_WORDS):
+        self.stop_words = stop_words
+        self.table_words = table_words
+        self.table_cell_words = table_cell_words
+
+    def classify(self, text):
+        repeated = False
+        garbled = False
+        for m in _RUNS.finditer(text):
+            if m.group(1) is None:
+                garbled = True
+            else:
+                repeated = True
+                if m.end() - m.start() >= 4:
+                    garbled = True
+        if not garbled:
+            garbled = (not text.isprintable() or
+                       (len(set(text)) < len(text) * 0.3 and len(text) > 10))
+
+        depth = depth_spaced = 0
+        date = page_number = caption = False
+        m = _PREFIX.match(text)
+        if m:
+            num = m.group("num")
+            if num is not None:
+                groups = num.count(".") + 1
+                dot = m.group("dot") is not None
+                if groups > 1:
+                    depth = min(groups, 4)
+                elif dot:
+                    depth = 1
+                if m.group("space") is not None and (groups == 1 or (not dot and groups <= 4)):
+                    depth_spaced = groups
+            else:
+                date = m.group("date") is not None
+                page_number = m.group("page") is not None
+                caption = m.group("caption") is not None
+
+        lower = text.lower()
+        table = (caption or
+                 lower in self.table_words or
+                 _NUMERIC_CELL.match(text) is not None or
+                 (text.count(".") > 3 and len(_DECIMAL.findall(text)) > 3) or
+                 (lower in self.table_cell_words and len(text.split()) <= 2))
+        return LineClass(garbled, repeated, depth, depth_spaced, table, date, page_number,
+                         lower in self.stop_words)
+
+
+LINE_CLASSIFIER = LineClassifier()
+
+
+def is_garbled_text(s):
+    """Detect and filter out garbled/corrupted text"""
+    return LINE_CLASSIFIER.classify(s).garbled
+
+
+def is_repeated_letters(s):
+    return LINE_CLASSIFIER.classify(s).repeated_letters
@@ -0,0 +1,223 @@
+import sys
+
+import numpy as np
+
+from line_classifier import LineClass
+from outline_model import HeadingCandidate, Line
+
+
+class LineTableBuilder:
+    """Accumulates lines column by column and freezes them into a LineTable."""
+
+    def __init__(self):
+        self.size = []
+        self.x0 = []
+        self.x1 = []
+        self.y0 = []
+        self.y1 = []
+        self.page = []
+        self.flags = []
+        self.font_id = []
+        self.text_id = []
+        self.fonts = []
+        self.texts = []
+        self.page_heights = {}
+        self._font_index = {}
+        self._text_index = {}
+
+    def append(self, text, size, font, x0, y0, x1, y1, page, flags=0):
+        font_id = self._font_index.get(font)
+        if font_id is None:
+            font_id = self._font_index[font] = len(self.fonts)
+            self.fonts.append(font)
+        text_id = self._text_index.get(text)
+        if text_id is None:
+            text_id = self._text_index[text] = len(self.texts)
+            self.texts.append(sys.intern(text))
+        self.size.append(size)
+        self.x0.append(x0)
+        self.x1.append(x1)
+        self.y0.append(y0)
+        self.y1.append(y1)
+        self.page.append(page)
+        self.flags.append(flags)
+        self.font_id.append(font_id)
+        self.text_id.append(text_id)
+
+    def build(self):
+        return LineTable(
+            np.array(self.size, dtype=np.float64),
+            np.array(self.x0, dtype=np.float64),
+            np.array(self.x1, dtype=np.float64),
+            np.array(self.y0, dtype=np.float64),
+            np.array(self.y1, dtype=np.float64),
+            np.array(self.page, dtype=np.int32),
+            np.array(self.flags, dtype=np.int32),
+            np.array(self.font_id, dtype=np.int32),
+            np.array(self.text_id, dtype=np.int32),
+            self.fonts,
+            self.texts,
+            self.page_heights,
+        )
+
+
+class LineTable:
+    """Columnar store of extracted text lines.
+
+    Geometry, size, page and flags are NumPy arrays; fonts and texts are
+    interned into lookup lists referenced by integer id, so a repeated
+    header costs one string for the whole document. page_heights maps page
+    numbers to page heights, where the reader knows them. Rows are materialized
+    as outline_model.Line (or HeadingCandidate) only for the handful of
+    lines that survive the vectorized filters.
+    """
+
+    def __init__(self, size, x0, x1, y0, y1, page, flags, font_id, text_id, fonts, texts, page_heights=None):
+        self.size = size
+        self.x0 = x0
+        self.x1 = x1
+        self.y0 = y0
+        self.y1 = y1
+        self.page = page
+        self.flags = flags
+        self.font_id = font_id
+        self.text_id = text_id
+        self.fonts = fonts
+        self.texts = texts
+        self.page_heights = page_heights if page_heights is not None else {}
+        self._text_len = None
+
+    def __len__(self):
+        return len(self.size)
+
+    @classmethod
+    def concat(cls, tables):
+        # Merge tables in order, re-interning font and text ids
+        font_index = {}
+        text_index = {}
+        font_ids = []
+        text_ids = []
+        page_heights = {}
+        for t in tables:
+            page_heights.update(t.page_heights)
+            font_map = np.array([font_index.setdefault(f, len(font_index)) for f in t.fonts], dtype=np.int32)
+            text_map = np.array([text_index.setdefault(x, len(text_index)) for x in t.texts], dtype=np.int32)
+            font_ids.append(font_map[t.font_id] if len(t) else t.font_id)
+            text_ids.append(text_map[t.text_id] if len(t) else t.text_id)
+
+        def cat(name, dtype):
+            return np.concatenate([getattr(t, name) for t in tables]) if tables else np.empty(0, dtype)
+
+        return cls(
+            cat("size", np.float64), cat("x0", np.float64), cat("x1", np.float64),
+            cat("y0", np.float64), cat("y1", np.float64), cat("page", np.int32),
+            cat("flags", np.int32),
+            np.concatenate(font_ids) if tables else np.empty(0, np.int32),
+            np.concatenate(text_ids) if tables else np.empty(0, np.int32),
+            list(font_index), list(text_index), page_heights,
+        )
+
+    def take(self, index):
+        """Rows at index as a new table; only the texts they use are kept."""
+        used, text_id = np.unique(self.text_id[index], return_inverse=True)
+        return LineTable(
+            self.size[index], self.x0[index], self.x1[index], self.y0[index], self.y1[index],
+            self.page[index], self.flags[index], self.font_id[index], text_id.astype(np.int32),
+            self.fonts, [self.texts[i] for i in used], self.page_heights,
+        )
+
+    def text(self, i):
+        return self.texts[self.text_id[i]]
+
+    def font(self, i):
+        return self.fonts[self.font_id[i]]
+
+    def row(self, i):
+        return Line(
+            self.texts[self.text_id[i]], float(self.size[i]), self.fonts[self.font_id[i]],
+            float(self.x0[i]), float(self.y0[i]), float(self.x1[i]), float(self.y1[i]), int(self.page[i]),
+        )
+
+    def rows(self, index):
+        return [self.row(i) for i in index]
+
+    def candidate(self, i, level, text=None):
+        """Row i as a HeadingCandidate of level, with text overriding the
+        row's own (after cleanup)."""
+        return HeadingCandidate(
+            self.texts[self.text_id[i]] if text is None else text, float(self.size[i]),
+            self.fonts[self.font_id[i]], float(self.x0[i]), float(self.y0[i]), float(self.x1[i]),
+            float(self.y1[i]), int(self.page[i]), level,
+        )
+
+    @property
+    def text_len(self):
+        # Length of every row's text, computed once per unique string
+        if self._text_len is None:
+            unique_len = np.fromiter((len(t) for t in self.texts), dtype=np.int32, count=len(self.texts))
+            self._text_len = unique_len[self.text_id]
+        return self._text_len
+
+    def text_mask(self, predicate):
+        # Evaluate a str -> bool predicate once per unique text, broadcast to rows
+        unique = np.fromiter((bool(predicate(t)) for t in self.texts), dtype=bool, count=len(self.texts))
+        return unique[self.text_id]
+
+    def classify(self, classifier):
+        """Classify every unique text once; returns a LineClass whose fields
+        are per-row arrays."""
+        classes = [classifier.classify(t) for t in self.texts]
+        columns = zip(*classes) if classes else [()] * len(LineClass._fields)
+        return LineClass(*(np.array(c)[self.text_id] if classes else np.zeros(0, dtype=bool) for c in columns))
+
+    def font_mask(self, predicate):
+        unique = np.fromiter((bool(predicate(f)) for f in self.fonts), dtype=bool, count=len(self.fonts))
+        return unique[self.font_id]
+
+    def page_top_sizes(self, k=2):
+        """Largest k distinct font sizes of every page, largest first."""
+        if not len(self):
+            return {}
+        order = np.lexsort((-self.size, self.page))
+        pages = self.page[order]
+        sizes = self.size[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (pages[1:] != pages[:-1]) | (sizes[1:] != sizes[:-1])
+        pages = pages[keep]
+        sizes = sizes[keep]
+        starts = np.flatnonzero(np.r_[True, pages[1:] != pages[:-1]])
+        ends = np.r_[starts[1:], len(pages)]
+        return {int(pages[s]): sizes[s:min(e, s + k)].tolist() for s, e in zip(starts, ends)}
+
+
+def merge_runs(link, x0, size, max_dx, max_dsize):
+    """First row of every multi-line heading the sequential merge builds.
+
+    The extractors walk their candidates in order and append a row to the
+    heading being built when it continues the row before it (link[i]: same
+    level, page and font, small vertical gap, all tested against row i-1)
+    and its x0 and size are within max_dx and max_dsize of the heading's
+    first row. The first-row tests are resolved as a fixed point: every
+    linked row is assumed to continue its run, the first row of each run
+    that fails its start's tests becomes a run start, and this repeats
+    until no row fails. Rows of a run before its first failure are settled,
+    so each pass only revisits the rows after a new start; real documents
+    take one or two passes.
+    """
+    start = ~np.asarray(link, dtype=bool)
+    if len(start):
+        start[0] = True
+    while True:
+        starts = np.flatnonzero(start)
+        first = starts[np.cumsum(start) - 1]
+        fails = ~((np.abs(x0 - x0[first]) < max_dx) & (np.abs(size - size[first]) < max_dsize))
+        if not fails.any():
+            return starts
+        before = np.cumsum(fails) - fails
+        start |= fails & (before == before[first])
+
+
+def join_runs(starts, texts):
+    """Texts of every run joined with single spaces, once per run."""
+    ends = starts[1:].tolist() + [len(texts)]
+    return [" ".join(texts[s:e]) for s, e in zip(starts.tolist(), ends)]
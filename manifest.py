@@ -0,0 +1,164 @@
+import json
+import os
+
+from result_cache import file_digest
+from temp_file import mkstemp_shared
+
+# Default manifest file name, kept in the output directory
+MANIFEST_NAME = ".outline-manifest.json"
+MANIFEST_VERSION = 2
+
+
+class Manifest:
+    """Remembers which inputs produced which outputs, so a re-run only
+    processes new or modified PDFs.
+
+    Each entry maps an input path (relative to the input directory) to its
+    size, mtime, SHA-256, the extractor fingerprint and the output path,
+    stored relative to output_dir so runs from any working directory agree.
+    An input is unchanged when size and mtime match; if only the mtime moved
+    the content hash decides. Completed documents are appended to a journal
+    next to the manifest and fsynced, so an interrupted run resumes where it
+    stopped; commit() folds the journal into the manifest atomically.
+    """
+
+    def __init__(self, path, fingerprint, output_dir):
+        self.path = path
+        self.output_dir = output_dir
+        self.journal_path = path + ".journal"
+        self.fingerprint = fingerprint
+        self.entries = self._load()
+        self._pending = {}
+        self._journal = None
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                entries = data["entries"]
+        except (OSError, ValueError):
+            pass
+        # Replay what an interrupted run completed after the last commit
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line of a crashed run
+                        break
+                    if record.get("deleted"):
+                        entries.pop(record["path"], None)
+                    else:
+                        entries[record["path"]] = record["entry"]
+        except OSError:
+            pass
+        return entries
+
+    def check(self, rel_path, pdf_path, out_path=None):
+        """True if the input must be (re)processed. The stat and hash taken
+        here are what record() stores, so a file modified while it is being
+        processed is picked up again by the next run. out_path=None accepts
+        whatever output was recorded (a bundle), as long as it still exists."""
+        st = os.stat(pdf_path)
+        entry = self.entries.get(rel_path)
+        if out_path is not None:
+            out_path = self._relative(out_path)
+        if (entry is not None and entry["fingerprint"] == self.fingerprint and
+                out_path in (None, entry["output"]) and os.path.exists(self._resolve(entry["output"]))):
+            if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                return False
+            digest = file_digest(pdf_path)
+            if digest == entry["sha256"]:
+                # Touched but not modified
+                self._append(rel_path, dict(entry, mtime_ns=st.st_mtime_ns))
+                return False
+        else:
+            digest = file_digest(pdf_path)
+        self._pending[rel_path] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+            "fingerprint": self.fingerprint,
+            "output": out_path,
+        }
+        return True
+
+    def digest(self, rel_path):
+        """SHA-256 taken by check() for an input that needs processing."""
+        return self._pending[rel_path]["sha256"]
+
+    def record(self, rel_path, output=None, shared=False):
+        """Mark a checked input as done; call after its output is written.
+        output overrides the path given to check(); shared outputs (bundles
+        holding many documents) are never deleted by remove_missing()."""
+        entry = self._pending.pop(rel_path)
+        if output is not None:
+            entry["output"] = self._relative(output)
+        if shared:
+            entry["shared"] = True
+        self._append(rel_path, entry)
+
+    def remove_missing(self, rel_paths):
+        """Delete outputs of inputs no longer present; returns their paths."""
+        present = set(rel_paths)
+        removed = []
+        for rel_path in [p for p in self.entries if p not in present]:
+            entry = self.entries[rel_path]
+            out_path = self._resolve(entry["output"])
+            stem = out_path[:-5] if out_path.endswith(".json") else out_path
+            paths = () if entry.get("shared") else (out_path, stem + ".metrics.json", stem + ".prom")
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self._write_journal({"path": rel_path, "deleted": True})
+            del self.entries[rel_path]
+            removed.append(rel_path)
+        return removed
+
+    def _relative(self, out_path):
+        return os.path.relpath(out_path, self.output_dir)
+
+    def _resolve(self, stored):
+        return os.path.join(self.output_dir, stored)
+
+    def _append(self, rel_path, entry):
+        self.entries[rel_path] = entry
+        self._write_journal({"path": rel_path, "entry": entry})
+
+    def _write_journal(self, record):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def commit(self):
+        """Write the manifest atomically and drop the journal."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = mkstemp_shared(directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        try:
+            os.unlink(self.journal_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,131 @@
+"""Library interface to the outline extractors.
+
+OutlineExtractor is configured once (backend, bookmark use, heading rule
+overrides, result cache, worker pool) and then reused for any number of
+documents, so library callers pay for validation, imports, the cache and
+the worker processes once instead of per document:
+
+    from outline_extractor import OutlineExtractor
+
+    with OutlineExtractor(backend="auto", rules={"merge_gap": 20}, workers=4) as extractor:
+        result = extractor.extract("report.pdf")          # or the PDF bytes
+        print(result.title, [h.text for h in result.outline])
+        for source, ok, result in extractor.extract_many(paths):
+            ...
+
+Every call returns a process_pdfs.Extraction: title, outline (a list of
+outline_model.Heading), cached, metrics, backend and reason.
+"""
+from functools import partial
+
+from outline_model import Outline
+from process_pdfs import AUTO_BACKENDS, BACKENDS, extract_document, extractor_fingerprint, heading_rules
+
+
+class OutlineExtractor:
+    """Extraction settings plus the resources they need, shared by calls.
+
+    backend is a registered backend name or "auto". rules maps
+    HeadingRules fields to values replacing the defaults of whichever
+    backend runs. cache_dir enables the on-disk result cache, keyed by the
+    extractor fingerprint of these settings. workers > 1 or a timeout runs
+    extract_many() in a worker pool, started on first use and kept until
+    close(); page_workers applies to in-process extraction.
+    """
+
+    def __init__(self, backend="auto", use_toc=True, rules=None, cache_dir=None, cache_size=512 * 1024 * 1024,
+                 workers=1, timeout=None, page_workers=1, instrument=False):
+        if backend != "auto" and backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}; expected 'auto' or one of {', '.join(sorted(BACKENDS))}")
+        self.rules = dict(rules or {})
+        # Resolve once so a bad field fails here, not in the first document
+        for name in ([backend] if backend != "auto" else AUTO_BACKENDS):
+            heading_rules(name, self.rules)
+        self.backend = backend
+        self.use_toc = use_toc
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.page_workers = page_workers
+        self.instrument = instrument
+        self.fingerprint = extractor_fingerprint(backend, use_toc=use_toc,
+                                                 rules=sorted(self.rules.items()) if self.rules else None)
+        self.cache = None
+        if cache_dir is not None:
+            from result_cache import ResultCache
+            self.cache = ResultCache(cache_dir, self.fingerprint, cache_size)
+        self._pool = None
+        # Import the PDF library now, before any pool forks
+        import fitz  # noqa: F401
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def rules_for(self, backend):
+        """Effective HeadingRules of backend under this configuration."""
+        return heading_rules(backend, self.rules)
+
+    def _task(self, page_workers):
+        # extract_document with these settings; a plain partial, so pool
+        # workers never need the extractor itself
+        return partial(extract_document, cache=self.cache, page_workers=page_workers, use_toc=self.use_toc,
+                       instrument=self.instrument, backend=self.backend, rules=self.rules)
+
+    def extract(self, source):
+        """Extract one document (path, bytes-like or pdf_input.PdfInput) in
+        this process; returns an Extraction and raises on failure."""
+        return self._task(self.page_workers)(source)
+
+    def extract_outline(self, source):
+        """extract(), as an outline_model.Outline."""
+        result = self.extract(source)
+        return Outline(result.title, result.outline)
+
+    def extract_many(self, sources):
+        """Extract every document of an iterable; yields (source, ok,
+        Extraction or error message) as each one finishes. Failures do not
+        stop the batch. Sources are read lazily, at most twice the worker
+        count ahead."""
+        if self.workers <= 1 and not self.timeout:
+            for source in sources:
+                try:
+                    yield source, True, self.extract(source)
+                except Exception as e:
+                    yield source, False, f"{type(e).__name__}: {e}"
+            return
+        yield from self._extract_pooled(sources)
+
+    def _extract_pooled(self, sources):
+        import concurrent.futures
+        from pdf_pool import PoolExecutor, TaskFailed
+        if self._pool is None:
+            self._pool = PoolExecutor(self._task(1), self.workers, self.timeout).start()
+        sources = iter(sources)
+        running = {}
+        pending = True
+        while True:
+            while pending and len(running) < 2 * self.workers:
+                try:
+                    source = next(sources)
+                except StopIteration:
+                    pending = False
+                    break
+                running[self._pool.submit(source)] = source
+            if not running:
+                return
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                source = running.pop(future)
+                try:
+                    yield source, True, future.result()
+                except TaskFailed as e:
+                    yield source, False, str(e)
+
@@ -0,0 +1,110 @@
+"""Slotted records passed between the extraction stages.
+
+Lines live in a LineTable; only the rows that survive its vectorized
+filters are materialized, as Line (or HeadingCandidate once a level is
+assigned). Extractors return their headings as Heading; Outline is the
+title plus headings, serialized to the output JSON. None of the classes
+has a per-instance __dict__, so a materialized row costs a fixed, small
+number of pointers instead of a dict sized for its keys.
+"""
+import json
+
+
+class Line:
+    """One text line (or span) of a page, y measured from the top."""
+
+    __slots__ = ("text", "size", "font", "x0", "y0", "x1", "y1", "page")
+
+    def __init__(self, text, size, font, x0, y0, x1, y1, page):
+        self.text = text
+        self.size = size
+        self.font = font
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.page = page
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.text!r}, page={self.page}, size={self.size})"
+
+
+class HeadingCandidate(Line):
+    """A line with a heading level; merge() appends the next line of a
+    multi-line heading, keeping this line's position and size."""
+
+    __slots__ = ("level",)
+
+    def __init__(self, text, size, font, x0, y0, x1, y1, page, level):
+        Line.__init__(self, text, size, font, x0, y0, x1, y1, page)
+        self.level = level
+
+    def merge(self, line):
+        self.text += " " + line.text
+        self.y1 = line.y1
+
+    def heading(self, page=None):
+        """The Heading of this candidate, on page if given (output page
+        numbering), with the text stripped."""
+        return Heading(self.level, self.text.strip(), self.page if page is None else page)
+
+
+class Heading:
+    """One outline entry: level ("H1".."H4"), text and output page number."""
+
+    __slots__ = ("level", "text", "page")
+
+    def __init__(self, level, text, page):
+        self.level = level
+        self.text = text
+        self.page = page
+
+    def __eq__(self, other):
+        if not isinstance(other, Heading):
+            return NotImplemented
+        return (self.level, self.text, self.page) == (other.level, other.text, other.page)
+
+    def __hash__(self):
+        return hash((self.level, self.text, self.page))
+
+    def __repr__(self):
+        return f"Heading({self.level!r}, {self.text!r}, {self.page})"
+
+    def to_dict(self):
+        return {"level": self.level, "text": self.text, "page": self.page}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["level"], d["text"], d["page"])
+
+
+class Outline:
+    """Title and headings of a document, in the output JSON layout."""
+
+    __slots__ = ("title", "headings")
+
+    def __init__(self, title, headings):
+        self.title = title
+        self.headings = headings
+
+    def __eq__(self, other):
+        if not isinstance(other, Outline):
+            return NotImplemented
+        return self.title == other.title and self.headings == other.headings
+
+    def __repr__(self):
+        return f"Outline({self.title!r}, {len(self.headings)} headings)"
+
+    def to_dict(self):
+        return {"title": self.title, "outline": headings_to_dicts(self.headings)}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["title"], [Heading.from_dict(h) for h in d["outline"]])
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+
+
+def headings_to_dicts(headings):
+    return [{"level": h.level, "text": h.text, "page": h.page} for h in headings]
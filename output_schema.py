@@ -0,0 +1,83 @@
+import json
+import os
+
+# Schema shipped with the sample dataset
+DEFAULT_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "sample_dataset", "schema", "output_schema.json")
+
+_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list,),
+    "null": (type(None),),
+}
+
+
+def load_schema(path=DEFAULT_SCHEMA):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _is_json_schema(schema):
+    return isinstance(schema, dict) and isinstance(schema.get("type"), str) and schema["type"] in _TYPES
+
+
+def _type_ok(value, name):
+    if isinstance(value, bool) and name in ("integer", "number"):
+        return False
+    return isinstance(value, _TYPES[name])
+
+
+def validate(value, schema, where="$"):
+    """Check value against schema; returns a list of error messages.
+
+    Two schema styles are understood: the template style of
+    sample_dataset/schema/output_schema.json, where an object lists its
+    (required, exclusive) keys, a one-element list describes every item
+    and a type name stands for a leaf; and the common subset of JSON
+    Schema (type, properties, required, additionalProperties, items).
+    """
+    if _is_json_schema(schema):
+        return _validate_json_schema(value, schema, where)
+    if isinstance(schema, str):
+        if schema not in _TYPES:
+            return [f"{where}: unknown type {schema!r} in schema"]
+        return [] if _type_ok(value, schema) else [f"{where}: expected {schema}, got {type(value).__name__}"]
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            return [f"{where}: expected array, got {type(value).__name__}"]
+        errors = []
+        for i, item in enumerate(value):
+            errors += validate(item, schema[0], f"{where}[{i}]") if schema else []
+        return errors
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            return [f"{where}: expected object, got {type(value).__name__}"]
+        errors = [f"{where}: missing {key!r}" for key in schema if key not in value]
+        errors += [f"{where}: unexpected {key!r}" for key in value if key not in schema]
+        for key, sub in schema.items():
+            if key in value:
+                errors += validate(value[key], sub, f"{where}.{key}")
+        return errors
+    return [f"{where}: unsupported schema {schema!r}"]
+
+
+def _validate_json_schema(value, schema, where):
+    if not _type_ok(value, schema["type"]):
+        return [f"{where}: expected {schema['type']}, got {type(value).__name__}"]
+    errors = []
+    if schema["type"] == "object":
+        properties = schema.get("properties", {})
+        errors += [f"{where}: missing {key!r}" for key in schema.get("required", ()) if key not in value]
+        if schema.get("additionalProperties") is False:
+            errors += [f"{where}: unexpected {key!r}" for key in value if key not in properties]
+        for key, sub in properties.items():
+            if key in value:
+                errors += validate(value[key], sub, f"{where}.{key}")
+    elif schema["type"] == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors += validate(item, schema["items"], f"{where}[{i}]")
+    return errors
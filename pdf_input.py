@@ -0,0 +1,137 @@
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+
+# Files at least this large are memory-mapped; smaller ones are read in one call
+MMAP_MIN_BYTES = 1024 * 1024
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable raw file over a memoryview, for libraries that want a file."""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class PdfInput:
+    """One PDF held in a single read-only buffer.
+
+    source is a path, bytes-like object or readable file. Large files are
+    memory-mapped once; smaller ones and file objects are read in a single
+    call; bytes-like sources are used as they are. Every consumer gets a
+    view of the same buffer: PyMuPDF opens it without copying, pdfminer and
+    pdfplumber read it through a seekable file, and the SHA-256 for the
+    result cache is taken from it, so the file is read from storage once
+    per document however many times it is opened.
+
+    path is set when the buffer maps a file, and source_path whenever it
+    was read from a named file (a path or a file object opened on one);
+    processes that only need part of the document reopen source_path
+    instead of receiving a copy of the buffer.
+    """
+
+    def __init__(self, source, name=None):
+        self.path = None
+        self.source_path = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = source
+        elif hasattr(source, "read"):
+            self._data = source.read()
+            file_name = getattr(source, "name", None)
+            if isinstance(file_name, str) and os.path.isfile(file_name):
+                self.source_path = file_name
+        else:
+            self.path = self.source_path = os.fspath(source)
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    self._data = f.read()
+        self.name = input_name(name if name is not None else self.path or source)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        # Another process re-opens the path, or receives a copy of the bytes
+        return PdfInput, (self.path if self.path is not None else bytes(self._data), self.name)
+
+    def view(self):
+        return memoryview(self._data)
+
+    def open_fitz(self):
+        """fitz.Document over the buffer, without copying it. The document
+        keeps its own view, so it stays valid after close()."""
+        import fitz
+        return fitz.open(stream=self.view(), filetype="pdf")
+
+    def open_file(self):
+        """Fresh seekable binary file over the buffer."""
+        return io.BufferedReader(_BufferReader(self.view()))
+
+    def sha256(self):
+        return hashlib.sha256(self.view()).hexdigest()
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:
+                # Documents still hold views; the mapping goes with the last one
+                pass
+
+
+def input_name(source):
+    """Short display name of a source: the file name, or "<bytes>"."""
+    if isinstance(source, PdfInput):
+        return source.name
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    return os.path.basename(name) if isinstance(name, str) else "<bytes>"
+
+
+def as_input(source):
+    """source as a PdfInput (unchanged if it already is one)."""
+    return source if isinstance(source, PdfInput) else PdfInput(source)
+
+
+@contextlib.contextmanager
+def opened_input(source):
+    """as_input(source) for a with block. A PdfInput made here is closed
+    when the block ends; one passed in stays open for its owner."""
+    pdf = as_input(source)
+    try:
+        yield pdf
+    finally:
+        if pdf is not source:
+            pdf.close()
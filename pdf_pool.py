@@ -0,0 +1,277 @@
+import concurrent.futures
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+
+
+def _worker_loop(conn, func):
+    # Runs inside the child: receive (key, args), send back (key, ok, result)
+    # Ctrl-C reaches the whole process group; the parent decides when we stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        key, args = task
+        try:
+            result = func(*args)
+            conn.send((key, True, result))
+        except Exception as e:
+            conn.send((key, False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, func):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(child_conn, func), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.key = None
+        self.started = None
+
+    def submit(self, key, args):
+        self.key = key
+        self.started = time.monotonic()
+        self.conn.send((key, args))
+
+    def release(self):
+        key = self.key
+        self.key = None
+        self.started = None
+        return key
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class WorkerPool:
+    """Process pool that enforces a per-task timeout and replaces dead workers.
+
+    Unlike concurrent.futures, a worker that segfaults inside PyMuPDF or hangs
+    past the timeout only loses its own task; the worker is restarted and the
+    rest of the batch keeps going.
+    """
+
+    def __init__(self, func, workers, timeout=None):
+        self.func = func
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self._ctx = mp.get_context()
+        self._workers = []
+
+    def __enter__(self):
+        self._workers = [_Worker(self._ctx, self.func) for _ in range(self.size)]
+        return self
+
+    def __exit__(self, *exc):
+        for w in self._workers:
+            w.stop()
+        self._workers = []
+
+    def _replace(self, worker):
+        worker.kill()
+        worker.conn.close()
+        idx = self._workers.index(worker)
+        self._workers[idx] = _Worker(self._ctx, self.func)
+        return self._workers[idx]
+
+    def idle(self):
+        return sum(w.key is None for w in self._workers)
+
+    def busy(self):
+        return sum(w.key is not None for w in self._workers)
+
+    def submit(self, key, args):
+        """Hand a task to an idle worker; returns False if all are busy."""
+        for w in reversed(self._workers):
+            if w.key is None:
+                if not w.process.is_alive():
+                    w = self._replace(w)
+                w.submit(key, args)
+                return True
+        return False
+
+    def collect(self, timeout=None, wakeup=()):
+        """Wait for running tasks and return the (key, ok, result_or_error)
+        of those that finished, crashed or timed out.
+
+        Returns early (possibly with nothing) once timeout seconds pass or one
+        of the extra wakeup handles (anything multiprocessing.connection.wait
+        accepts) becomes ready.
+        """
+        busy = [w for w in self._workers if w.key is not None]
+        wait_for = timeout
+        if self.timeout and busy:
+            now = time.monotonic()
+            deadline = max(0, min(w.started + self.timeout - now for w in busy))
+            wait_for = deadline if wait_for is None else min(wait_for, deadline)
+        handles = {}
+        for w in busy:
+            handles[w.conn] = w
+            handles[w.process.sentinel] = w
+        ready = wait(list(handles) + list(wakeup), timeout=wait_for)
+
+        finished = []
+        done = set()
+        for h in ready:
+            w = handles.get(h)
+            if w is None or w in done:
+                continue
+            done.add(w)
+            try:
+                _, ok, result = w.conn.recv()
+            except (EOFError, OSError):
+                # Worker died mid-task (e.g. a crash inside the PDF library)
+                w.process.join(1)
+                code = w.process.exitcode
+                key = w.release()
+                self._replace(w)
+                finished.append((key, False, f"worker crashed (exit code {code})"))
+                continue
+            finished.append((w.release(), ok, result))
+
+        if self.timeout:
+            now = time.monotonic()
+            for w in busy:
+                if w not in done and w.key is not None and now - w.started >= self.timeout:
+                    key = w.release()
+                    self._replace(w)
+                    finished.append((key, False, f"timed out after {self.timeout}s"))
+        return finished
+
+    def imap_unordered(self, tasks):
+        # tasks: iterable of (key, args); yields (key, ok, result_or_error)
+        # as soon as each one finishes.
+        tasks = iter(tasks)
+        pending = True
+        while True:
+            while pending and self.idle():
+                try:
+                    key, args = next(tasks)
+                except StopIteration:
+                    pending = False
+                    break
+                self.submit(key, args)
+            if not self.busy():
+                return
+            yield from self.collect()
+
+
+class TaskFailed(Exception):
+    """A pooled task raised, crashed its worker or timed out; the message is
+    the one the pool reported ("timed out after ...", "worker crashed ...")."""
+
+
+class PoolExecutor:
+    """WorkerPool behind a submit() that returns concurrent.futures.Future.
+
+    One dispatcher thread owns the pool: it hands queued tasks to idle
+    workers and resolves their futures, sleeping in the pool's wait()
+    until a worker finishes or submit() wakes it through a pipe. Other
+    threads, or an event loop through asyncio.wrap_future, only ever touch
+    the futures. queue_size bounds the tasks waiting for a worker (0 = no
+    bound); submit() raises queue.Full beyond it.
+    """
+
+    def __init__(self, func, workers, timeout=None, queue_size=0):
+        self.func = func
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._ids = itertools.count()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._stopping = False
+        self._thread = None
+        self.busy = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="pool-dispatcher", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def shutdown(self):
+        """Stop the workers; tasks not finished yet fail with TaskFailed."""
+        self._stopping = True
+        os.write(self._wake_w, b"x")
+        self._thread.join()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def queue_size(self):
+        return self._queue.maxsize
+
+    def queued(self):
+        return self._queue.qsize()
+
+    def submit(self, *args):
+        """Queue func(*args); returns its future."""
+        future = concurrent.futures.Future()
+        self._queue.put_nowait((next(self._ids), args, future))
+        os.write(self._wake_w, b"x")
+        return future
+
+    def _run(self, ready):
+        futures = {}
+        with WorkerPool(self.func, self.workers, self.timeout) as pool:
+            ready.set()
+            while not self._stopping:
+                while pool.idle():
+                    try:
+                        key, args, future = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    futures[key] = future
+                    pool.submit(key, args)
+                self.busy = pool.busy()
+                for key, ok, result in pool.collect(wakeup=[self._wake_r]):
+                    future = futures.pop(key)
+                    if ok:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(TaskFailed(result))
+                try:
+                    while os.read(self._wake_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+        while True:
+            try:
+                futures[object()] = self._queue.get_nowait()[2]
+            except queue.Empty:
+                break
+        for future in futures.values():
+            future.set_exception(TaskFailed("pool stopped"))
@@ -0,0 +1,214 @@
+"""Overlapped read, extract and write stages for batch runs.
+
+A batch run spends its time in three kinds of work: reading PDFs (disk or
+network I/O), extracting outlines (CPU) and writing results (small I/O).
+Run one after the other, the CPU waits for every read and the storage
+waits for every extraction. The pipeline runs them concurrently on an
+asyncio loop, connected by bounded queues:
+
+    jobs -> read (prefetch threads) -> [read queue] -> extract (executor)
+         -> [write queue] -> write (one thread, batched)
+
+The read queue holds the bytes of documents read ahead of extraction, so
+its depth bounds the memory spent on prefetch. Listing the input, the
+manifest checks and all writes run on one serial thread, so the manifest,
+bundle and stdout are only touched from there. Each stage records how long
+its slots were busy and how full its input queue was; stats() reports
+utilization per stage.
+"""
+import asyncio
+import concurrent.futures
+import time
+
+from pdf_pool import TaskFailed
+
+# Documents read ahead of extraction, and reader threads filling that queue
+DEFAULT_PREFETCH = 8
+DEFAULT_READ_THREADS = 4
+# Results waiting to be written, and most results written per executor call
+DEFAULT_WRITE_QUEUE = 32
+DEFAULT_WRITE_BATCH = 16
+
+_DONE = object()
+
+
+class StageStats:
+    """Busy time and input queue occupancy of one pipeline stage."""
+
+    def __init__(self, name, slots, queue_size=0):
+        self.name = name
+        self.slots = slots
+        self.queue_size = queue_size
+        self.items = 0
+        self.busy = 0.0
+        self._depth_sum = 0
+        self._depth_samples = 0
+        self.max_depth = 0
+
+    def sample(self, queue):
+        depth = queue.qsize()
+        self._depth_sum += depth
+        self._depth_samples += 1
+        self.max_depth = max(self.max_depth, depth)
+
+    def to_dict(self, wall):
+        out = {
+            "slots": self.slots,
+            "items": self.items,
+            "busy_seconds": round(self.busy, 6),
+            "utilization": round(self.busy / (wall * self.slots), 4) if wall > 0 else 0.0,
+        }
+        if self.queue_size:
+            out["queue_size"] = self.queue_size
+            out["queue_mean"] = round(self._depth_sum / self._depth_samples, 2) if self._depth_samples else 0.0
+            out["queue_max"] = self.max_depth
+        return out
+
+
+class Pipeline:
+    """Runs jobs through read, extract and write with bounded queues.
+
+    read(job) returns the input handed to extract(job, data); both read and
+    write(results) run in threads, write with a list of (job, ok, result)
+    of at most write_batch entries. extract(job, data) returns a
+    concurrent.futures.Future (from a process pool, say) and extract_slots
+    caps how many are in flight. A read or extraction that raises becomes
+    an (job, False, "ExceptionName: message") result, as the worker pool
+    reports failures.
+    """
+
+    def __init__(self, read, extract, write, extract_slots=1, prefetch=DEFAULT_PREFETCH,
+                 read_threads=DEFAULT_READ_THREADS, write_queue=DEFAULT_WRITE_QUEUE,
+                 write_batch=DEFAULT_WRITE_BATCH):
+        self.read = read
+        self.extract = extract
+        self.write = write
+        self.extract_slots = max(1, extract_slots)
+        self.prefetch = max(1, prefetch)
+        self.read_threads = max(1, read_threads)
+        self.write_queue = max(1, write_queue)
+        self.write_batch = max(1, write_batch)
+        self.stages = {
+            "read": StageStats("read", self.read_threads),
+            "extract": StageStats("extract", self.extract_slots, self.prefetch),
+            "write": StageStats("write", 1, self.write_queue),
+        }
+        self.wall = 0.0
+
+    def run(self, jobs):
+        """Process every job of the iterable; returns stats()."""
+        start = time.perf_counter()
+        try:
+            asyncio.run(self._run(jobs))
+        finally:
+            self.wall = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        return {"wall_seconds": round(self.wall, 6),
+                "stages": {name: stage.to_dict(self.wall) for name, stage in self.stages.items()}}
+
+    async def _run(self, jobs):
+        loop = asyncio.get_running_loop()
+        serial = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="pipeline-serial")
+        readers = concurrent.futures.ThreadPoolExecutor(self.read_threads, thread_name_prefix="pipeline-read")
+        pending = asyncio.Queue(self.read_threads)
+        read_queue = asyncio.Queue(self.prefetch)
+        write_queue = asyncio.Queue(self.write_queue)
+        try:
+            stages = [
+                self._list(loop, serial, iter(jobs), pending),
+                self._finish(read_queue, self.extract_slots,
+                             *(self._read(loop, readers, pending, read_queue) for _ in range(self.read_threads))),
+                self._finish(write_queue, 1,
+                             *(self._extract(read_queue, write_queue) for _ in range(self.extract_slots))),
+                self._write(loop, serial, write_queue),
+            ]
+            await asyncio.gather(*stages)
+        finally:
+            readers.shutdown(wait=True)
+            serial.shutdown(wait=True)
+
+    async def _finish(self, queue, consumers, *workers):
+        # Once every worker of a stage is done, tell each consumer downstream
+        await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await queue.put(_DONE)
+
+    async def _list(self, loop, serial, jobs, pending):
+        # Jobs are pulled one at a time on the serial thread, so listing the
+        # input (and any manifest check done by the iterator) overlaps the
+        # other stages but never runs next to a write
+        while True:
+            job = await loop.run_in_executor(serial, next, jobs, _DONE)
+            if job is _DONE:
+                break
+            await pending.put(job)
+        for _ in range(self.read_threads):
+            await pending.put(_DONE)
+
+    async def _read(self, loop, readers, pending, read_queue):
+        stage = self.stages["read"]
+        while True:
+            job = await pending.get()
+            if job is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                item = (job, True, await loop.run_in_executor(readers, self.read, job))
+            except Exception as e:
+                item = (job, False, f"{type(e).__name__}: {e}")
+            stage.busy += time.perf_counter() - started
+            stage.items += 1
+            await read_queue.put(item)
+
+    async def _extract(self, read_queue, write_queue):
+        stage = self.stages["extract"]
+        while True:
+            stage.sample(read_queue)
+            item = await read_queue.get()
+            if item is _DONE:
+                return
+            job, ok, data = item
+            if ok:
+                started = time.perf_counter()
+                try:
+                    item = (job, True, await asyncio.wrap_future(self.extract(job, data)))
+                except TaskFailed as e:
+                    item = (job, False, str(e))
+                except Exception as e:
+                    item = (job, False, f"{type(e).__name__}: {e}")
+                stage.busy += time.perf_counter() - started
+                stage.items += 1
+            # The buffer is released here, before the result waits to be written
+            del data
+            await write_queue.put(item)
+
+    async def _write(self, loop, serial, write_queue):
+        stage = self.stages["write"]
+        done = False
+        while not done:
+            stage.sample(write_queue)
+            batch = [await write_queue.get()]
+            while len(batch) < self.write_batch and not write_queue.empty():
+                batch.append(write_queue.get_nowait())
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+            if batch:
+                started = time.perf_counter()
+                await loop.run_in_executor(serial, self.write, batch)
+                stage.busy += time.perf_counter() - started
+                stage.items += len(batch)
+
+
+def format_stats(stats):
+    """One line per stage: utilization, items and queue occupancy."""
+    lines = [f"Pipeline: {stats['wall_seconds']:.2f}s"]
+    for name, stage in stats["stages"].items():
+        line = (f"  {name:<8} {stage['utilization'] * 100:5.1f}% busy of {stage['slots']} "
+                f"slot{'s' if stage['slots'] != 1 else ''}, {stage['items']} items")
+        if "queue_size" in stage:
+            line += f", queue mean {stage['queue_mean']}/{stage['queue_size']} max {stage['queue_max']}"
+        lines.append(line)
+    return "\n".join(lines)
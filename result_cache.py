@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import time
+
+from temp_file import mkstemp_shared
+
+# Default size cap of the cache directory
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Re-scan the directory for eviction after this many writes from one process
+EVICT_EVERY = 64
+# Temp files older than this are left over from a writer that died before
+# renaming them into place; eviction deletes them
+STALE_TEMP_SECONDS = 3600
+
+_CHUNK = 1024 * 1024
+
+def file_digest(pdf_path):
+    """SHA-256 of the file contents, read in chunks."""
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of {"title", "outline"} results.
+
+    Entries are keyed by the SHA-256 of the PDF bytes combined with a
+    fingerprint of the extractor (version and configuration), so a changed
+    heuristic never serves stale results. Every entry is written to a temp
+    file and renamed into place, which keeps concurrent workers from ever
+    reading a half-written entry. Reads bump the entry's mtime, and once
+    the directory grows past max_bytes the least recently used entries are
+    deleted.
+    """
+
+    def __init__(self, directory, fingerprint, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, pdf_path=None, digest=None):
+        if digest is None:
+            digest = file_digest(pdf_path)
+        return hashlib.sha256(f"{self.fingerprint}:{digest}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = mkstemp_shared(os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self):
+        """Delete stale temp files, then least recently used entries until
+        the cache fits max_bytes."""
+        entries = []
+        total = 0
+        stale = time.time() - STALE_TEMP_SECONDS
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                is_temp = entry.name.endswith(".tmp")
+                if not is_temp and not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if is_temp:
+                    if st.st_mtime < stale:
+                        try:
+                            os.unlink(entry.path)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                # Already removed by another worker
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,283 @@
+"""Resident outline extraction service.
+
+Keeps a warm pool of worker processes (process_pdfs is imported once, before
+the workers fork) and serves extraction over HTTP on a TCP port or a Unix
+socket:
+
+    POST /outline   body: the PDF bytes -> {"title": ..., "outline": [...]}
+    GET  /health    pool and queue state as JSON
+    GET  /metrics   request counters in Prometheus text format
+
+Requests beyond the worker count wait in a bounded queue; once it is full
+the service answers 503 with Retry-After instead of piling up work.
+
+    python service.py --port 8080 --workers 4
+    python service.py --socket /run/pdf-outline.sock
+"""
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from outline_model import Outline
+from pdf_pool import PoolExecutor, TaskFailed
+from process_pdfs import BACKENDS, default_cache_dir, extract_document, extractor_fingerprint
+
+# Largest accepted request body
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ExtractionError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class OutlineService:
+    """Feeds queued documents to a PoolExecutor.
+
+    Request threads call extract() and block on a future; the executor's
+    dispatcher thread is the only one touching the worker processes.
+    """
+
+    def __init__(self, workers=1, timeout=None, queue_size=16, cache=None, use_toc=True, backend="auto"):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._pool = PoolExecutor(partial(extract_document, cache=cache, use_toc=use_toc, backend=backend),
+                                  self.workers, timeout, queue_size)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {"ok": 0, "cached": 0, "failed": 0, "timeout": 0, "rejected": 0}
+        self.latency_sum = 0.0
+
+    def start(self):
+        # Import the PDF library before the workers fork so each starts warm
+        import fitz  # noqa: F401
+        self._pool.start()
+        return self
+
+    def stop(self):
+        self._pool.shutdown()
+
+    def _count(self, name, seconds=None):
+        with self._lock:
+            self.counters[name] += 1
+            if seconds is not None:
+                self.latency_sum += seconds
+
+    def submit(self, pdf_path):
+        """Queue a document (a path or the PDF bytes); returns a future of
+        its process_pdfs.Extraction."""
+        try:
+            return self._pool.submit(pdf_path)
+        except queue.Full:
+            self._count("rejected")
+            raise QueueFull(f"{self._pool.queue_size} documents already queued")
+
+    def extract(self, pdf_path):
+        start = time.monotonic()
+        try:
+            result = self.submit(pdf_path).result()
+        except TaskFailed as e:
+            message = str(e)
+            status = 504 if message.startswith("timed out") else 503 if message == "pool stopped" else 422
+            self._count("timeout" if status == 504 else "failed", time.monotonic() - start)
+            raise ExtractionError("service stopped" if status == 503 else message, status)
+        self._count("cached" if result.cached else "ok", time.monotonic() - start)
+        return result
+
+    def health(self):
+        return {
+            "status": "ok" if self._pool.running else "stopped",
+            "workers": self.workers,
+            "busy": self._pool.busy,
+            "queued": self._pool.queued(),
+            "queue_size": self._pool.queue_size,
+            "uptime_seconds": round(time.time() - self.started, 3),
+        }
+
+    def prometheus(self):
+        h = self.health()
+        with self._lock:
+            counters = dict(self.counters)
+            latency_sum = self.latency_sum
+        out = [
+            "# HELP pdf_outline_requests_total Extraction requests by outcome.",
+            "# TYPE pdf_outline_requests_total counter",
+        ]
+        for status, value in counters.items():
+            out.append(f'pdf_outline_requests_total{{status="{status}"}} {value}')
+        answered = sum(v for k, v in counters.items() if k != "rejected")
+        out += [
+            "# HELP pdf_outline_request_seconds Time from queueing to result.",
+            "# TYPE pdf_outline_request_seconds summary",
+            f"pdf_outline_request_seconds_sum {latency_sum:.6f}",
+            f"pdf_outline_request_seconds_count {answered}",
+            "# HELP pdf_outline_workers Worker processes in the pool.",
+            "# TYPE pdf_outline_workers gauge",
+            f"pdf_outline_workers {h['workers']}",
+            "# HELP pdf_outline_busy_workers Workers running a document.",
+            "# TYPE pdf_outline_busy_workers gauge",
+            f"pdf_outline_busy_workers {h['busy']}",
+            "# HELP pdf_outline_queue_depth Documents waiting for a worker.",
+            "# TYPE pdf_outline_queue_depth gauge",
+            f"pdf_outline_queue_depth {h['queued']}",
+        ]
+        return "\n".join(out) + "\n"
+
+
+class OutlineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "pdf-outline"
+
+    def _send(self, status, body, content_type="application/json", headers=()):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, service.health())
+        elif self.path == "/metrics":
+            self._send(200, service.prometheus().encode(), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/outline":
+            self._send(404, {"error": "not found"})
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send(411, {"error": "Content-Length required"})
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            self._send(400, {"error": "invalid Content-Length"})
+            return
+        if length > self.server.max_bytes:
+            self.close_connection = True
+            self._send(413, {"error": f"body larger than {self.server.max_bytes} bytes"})
+            return
+
+        # The body goes to the worker as bytes; no temp file is written
+        body = bytearray(length)
+        view = memoryview(body)
+        received = 0
+        while received < length:
+            n = self.rfile.readinto(view[received:received + 1024 * 1024])
+            if not n:
+                break
+            received += n
+        view.release()
+        if received < length:
+            self.close_connection = True
+            self._send(400, {"error": "incomplete body"})
+            return
+        try:
+            result = self.server.service.extract(body)
+        except QueueFull as e:
+            self._send(503, {"error": str(e)}, headers=[("Retry-After", "1")])
+            return
+        except ExtractionError as e:
+            self._send(e.status, {"error": str(e)})
+            return
+        self._send(200, Outline(result.title, result.outline).to_dict(),
+                   headers=[("X-Cache", "hit" if result.cached else "miss"),
+                            ("X-Backend", result.backend),
+                            ("X-Backend-Reason", result.reason)])
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8080, socket_path=None,
+                max_bytes=DEFAULT_MAX_BYTES, quiet=False):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, OutlineHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), OutlineHandler)
+    server.service = service
+    server.max_bytes = max_bytes
+    server.quiet = quiet
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve PDF outline extraction from a warm worker pool")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--socket", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=None, help="per-document wall-clock limit in seconds")
+    parser.add_argument("--queue", type=int, default=16,
+                        help="documents allowed to wait for a worker before requests get 503")
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="largest accepted PDF in MB")
+    parser.add_argument("--no-toc", action="store_true",
+                        help="ignore embedded PDF bookmarks and always analyse the page layout")
+    parser.add_argument("--backend", choices=["auto"] + sorted(BACKENDS), default="auto",
+                        help="extractor to use; auto picks one per document")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the result cache")
+    parser.add_argument("--cache-dir", default=default_cache_dir())
+    parser.add_argument("--cache-size", type=int, default=512, help="result cache size cap in MB")
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = None
+    if not args.no_cache and args.cache_dir:
+        from result_cache import ResultCache
+        cache = ResultCache(args.cache_dir, extractor_fingerprint(args.backend, use_toc=not args.no_toc),
+                            args.cache_size * 1024 * 1024)
+    service = OutlineService(args.workers, args.timeout, args.queue, cache, not args.no_toc, args.backend).start()
+    server = make_server(service, args.host, args.port, args.socket, args.max_mb * 1024 * 1024, quiet=args.quiet)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving outlines on {where} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
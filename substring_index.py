@@ -0,0 +1,204 @@
+from collections import defaultdict
+
+# Length of the grams used to index stored texts
+GRAM = 3
+
+
+class _SuffixAutomaton:
+    """Generalized suffix automaton over several strings.
+
+    contains(q) tells whether q occurs inside any inserted string in O(len(q)),
+    independent of how many strings are stored or how long they are. Strings
+    are inserted one character at a time; extend() continues the string that
+    was started last, which is how merged headings grow.
+    """
+
+    def __init__(self):
+        self.next = [{}]
+        self.link = [-1]
+        self.length = [0]
+        self.last = 0
+
+    def start(self):
+        self.last = 0
+
+    def _clone(self, q, length):
+        self.next.append(dict(self.next[q]))
+        self.link.append(self.link[q])
+        self.length.append(length)
+        clone = len(self.length) - 1
+        self.link[q] = clone
+        return clone
+
+    def _redirect(self, p, ch, q, clone):
+        nxt = self.next
+        while p != -1 and nxt[p].get(ch) == q:
+            nxt[p][ch] = clone
+            p = self.link[p]
+
+    def extend(self, text):
+        nxt, link, length = self.next, self.link, self.length
+        for ch in text:
+            p = self.last
+            q = nxt[p].get(ch)
+            if q is not None:
+                # Another string already has this continuation
+                if length[p] + 1 == length[q]:
+                    self.last = q
+                else:
+                    clone = self._clone(q, length[p] + 1)
+                    self._redirect(p, ch, q, clone)
+                    self.last = clone
+                continue
+            nxt.append({})
+            link.append(0)
+            length.append(length[p] + 1)
+            cur = len(length) - 1
+            while p != -1 and ch not in nxt[p]:
+                nxt[p][ch] = cur
+                p = link[p]
+            if p != -1:
+                q = nxt[p][ch]
+                if length[p] + 1 == length[q]:
+                    link[cur] = q
+                else:
+                    clone = self._clone(q, length[p] + 1)
+                    self._redirect(p, ch, q, clone)
+                    link[cur] = clone
+            self.last = cur
+
+    def contains(self, q):
+        nxt = self.next
+        state = 0
+        for ch in q:
+            state = nxt[state].get(ch)
+            if state is None:
+                return False
+        return True
+
+
+class SubstringIndex:
+    """Answers "is any stored text a substring of q, or q a substring of it?"
+    without scanning every stored text.
+
+    "q in t" is a walk of a suffix automaton over all stored texts. For
+    "t in q", stored texts are bucketed by their first 3-gram, so only texts
+    starting with one of q's grams are compared. related() additionally
+    needs the keys of texts containing q; those come from 3-gram postings
+    that are built the first time related() is called. Texts shorter than a
+    gram are kept in a small list and checked directly.
+    """
+
+    def __init__(self):
+        self.texts = []
+        self._sam = _SuffixAutomaton()
+        self._heads = defaultdict(set)
+        self._short = []
+        self._grams = None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        key = len(self.texts)
+        self.texts.append(text)
+        self._sam.start()
+        self._sam.extend(text)
+        self._post_head(key, text)
+        self._grams = None
+        return key
+
+    def update(self, key, text):
+        # Merging only ever appends to the most recently added text, which
+        # the automaton can continue in place; anything else is rebuilt.
+        old = self.texts[key]
+        self.texts[key] = text
+        self._grams = None
+        if key == len(self.texts) - 1 and text.startswith(old):
+            self._sam.extend(text[len(old):])
+            if len(old) < GRAM:
+                self._short.remove(key)
+                self._post_head(key, text)
+        else:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._sam = _SuffixAutomaton()
+        self._heads = defaultdict(set)
+        self._short = []
+        for key, text in enumerate(self.texts):
+            self._sam.start()
+            self._sam.extend(text)
+            self._post_head(key, text)
+
+    def _post_head(self, key, text):
+        if len(text) < GRAM:
+            self._short.append(key)
+        else:
+            self._heads[text[:GRAM]].add(key)
+
+    def _inside(self, q):
+        # Keys of stored texts (at least a gram long) that occur inside q
+        texts = self.texts
+        for i in range(len(q) - GRAM + 1):
+            for key in self._heads.get(q[i:i + GRAM], ()):
+                if texts[key] in q:
+                    yield key
+
+    def overlaps(self, q):
+        """True if any stored text contains q or is contained in q."""
+        texts = self.texts
+        if not texts:
+            return False
+        for key in self._short:
+            t = texts[key]
+            if t in q or q in t:
+                return True
+        if self._sam.contains(q):
+            return True
+        return any(True for _ in self._inside(q))
+
+    def related(self, q):
+        """Keys of stored texts t with t in q or q in t, in insertion order."""
+        texts = self.texts
+        if not texts:
+            return []
+        found = set(self._inside(q))
+        for key in self._short:
+            t = texts[key]
+            if t in q or q in t:
+                found.add(key)
+        if not self._sam.contains(q):
+            return sorted(found)
+        if len(q) < GRAM:
+            # Too short to index: q may sit inside any stored text
+            found.update(k for k, t in enumerate(texts) if q in t)
+            return sorted(found)
+        # Stored texts containing q contain every gram of q; probe the rarest
+        if self._grams is None:
+            self._grams = defaultdict(set)
+            for key, text in enumerate(texts):
+                for i in range(len(text) - GRAM + 1):
+                    self._grams[text[i:i + GRAM]].add(key)
+        postings = min((self._grams.get(q[i:i + GRAM], ()) for i in range(len(q) - GRAM + 1)), key=len)
+        found.update(key for key in postings if q in texts[key])
+        return sorted(found)
+
+
+def drop_contained_on_page(items):
+    """Of headings on the same page whose texts contain one another, keep
+    only the longest. Items have page and text attributes; order is kept."""
+    by_page = defaultdict(SubstringIndex)
+    for s in items:
+        by_page[s.page].add(s.text)
+    filtered = []
+    for s in items:
+        index = by_page[s.page]
+        related = [index.texts[k] for k in index.related(s.text)]
+        if any(t != s.text for t in related):
+            # Only keep the longer one
+            if all(len(s.text) >= len(t) for t in related):
+                filtered.append(s)
+        else:
+            filtered.append(s)
+    return filtered
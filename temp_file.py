@@ -0,0 +1,21 @@
+import errno
+import os
+import secrets
+import tempfile
+
+# Flags of tempfile.mkstemp, write-only
+_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0)
+
+
+def mkstemp_shared(directory, suffix=".tmp"):
+    """tempfile.mkstemp, but created with mode 0666 so the kernel applies
+    the umask as open() would, instead of 0600; files renamed into place
+    from it stay readable to whoever shares the directory. Returns
+    (fd, path) of a new file opened for writing."""
+    for _ in range(tempfile.TMP_MAX):
+        path = os.path.join(directory, "tmp" + secrets.token_hex(8) + suffix)
+        try:
+            return os.open(path, _FLAGS, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, "no usable temporary file name", directory)
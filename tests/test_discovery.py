@@ -0,0 +1,46 @@
+import pytest
+
+from discovery import discover, parse_shard
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in ("a.pdf", "B.PDF", "notes.txt", "sub/c.pdf", "sub/deep/d.pdf", "skip/e.pdf"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%PDF")
+    for i in range(40):
+        (tmp_path / "many").mkdir(exist_ok=True)
+        (tmp_path / "many" / ("f%02d.pdf" % i)).write_bytes(b"%PDF")
+    return tmp_path
+
+
+def _rel_paths(root, **kwargs):
+    return [rel for rel, _ in discover(str(root), **kwargs)]
+
+
+def test_recursive_case_insensitive_with_excludes(tree):
+    found = _rel_paths(tree, exclude=("skip", "many"))
+    assert sorted(found) == ["B.PDF", "a.pdf", "sub/c.pdf", "sub/deep/d.pdf"]
+    # Files of a directory come before its subdirectories
+    assert found.index("sub/c.pdf") < found.index("sub/deep/d.pdf")
+    assert _rel_paths(tree, include=("*/deep/*.pdf",)) == ["sub/deep/d.pdf"]
+
+
+def test_shards_partition_the_tree(tree):
+    everything = _rel_paths(tree)
+    shards = [_rel_paths(tree, shard=(i, 3)) for i in range(3)]
+    assert sorted(sum(shards, [])) == sorted(everything)
+    assert all(shards)
+    # The split depends on the path only, so every run agrees
+    assert shards == [_rel_paths(tree, shard=(i, 3)) for i in range(3)]
+
+
+@pytest.mark.parametrize("value", ["1", "3/3", "-1/2", "a/b", "0/0"])
+def test_parse_shard_rejects(value):
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+
+def test_parse_shard():
+    assert parse_shard("2/5") == (2, 5)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from header_footer import HeaderFooterIndex, fingerprint
+from line_table import LineTableBuilder
+
+HEIGHT = 800
+
+
+def _page(page, lines):
+    # lines: (text, y0) on a HEIGHT-point page, y measured from the top
+    table = LineTableBuilder()
+    table.page_heights[page] = HEIGHT
+    for text, y0 in lines:
+        table.append(text, 10, "Helvetica", 50, y0, 300, y0 + 10, page)
+    return table.build()
+
+
+def _document(pages=4):
+    return [_page(p, [("Annual Report - page %d" % p, 20), ("Body text %d" % p, 400),
+                      ("Summary", 500), ("%d" % p, 780)]) for p in range(1, pages + 1)]
+
+
+def test_fingerprint_masks_digits_but_not_section_numbers():
+    assert fingerprint("Page 3 of  10") == fingerprint("page 4 of 10")
+    assert fingerprint("2.1 Scope") != fingerprint("3.1 Scope")
+
+
+def test_feed_marks_running_lines_from_their_third_page():
+    index = HeaderFooterIndex()
+    marked = [index.feed(lines) for lines in _document()]
+    # Header and page number; "Summary" repeats in the body and is kept
+    assert [m.tolist() for m in marked[:2]] == [[False] * 4] * 2
+    assert [m.tolist() for m in marked[2:]] == [[True, False, False, True]] * 2
+
+
+def test_running_marks_every_occurrence_once_the_document_is_added():
+    index = HeaderFooterIndex()
+    keys = [index.add(lines) for lines in _document()]
+    assert all(index.running(k).tolist() == [True, False, False, True] for k in keys)
+
+
+def test_margin_line_on_too_few_pages_is_kept():
+    index = HeaderFooterIndex()
+    keys = [index.add(lines) for lines in _document(pages=2)]
+    assert not np.concatenate([index.running(k) for k in keys]).any()
+
+
+def test_y_up_coordinates():
+    # pdfminer measures y from the bottom: a header sits near y = HEIGHT
+    index = HeaderFooterIndex(y_up=True)
+    keys = [index.add(_page(p, [("Confidential", HEIGHT - 30), ("Body", 400)])) for p in range(1, 4)]
+    assert all(index.running(k).tolist() == [True, False] for k in keys)
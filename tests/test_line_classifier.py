@@ -0,0 +1,47 @@
+import pytest
+
+from line_classifier import LINE_CLASSIFIER
+
+LINES = [
+    "1. Introduction", "2.3 Scope", "1.2.3.4.5 Deep nesting", "3 Overview", "12/05/2024", "12",
+    "Table 3 results", "Figure 2", "aaaa bbb", "Coool idea", "continued", "yes", "Hello...!!!",
+    "1.1 1.2 1.3 1.4 1.5", "Revision History", "\x00bad", "",
+]
+
+
+@pytest.mark.parametrize("text, depth, depth_spaced", [
+    ("1. Introduction", 1, 1),
+    ("2.3 Scope", 2, 2),
+    ("1.2.3.4.5 Deep nesting", 4, 0),
+    ("3 Overview", 0, 1),
+    ("Overview", 0, 0),
+])
+def test_numbering_depth(text, depth, depth_spaced):
+    c = LINE_CLASSIFIER.classify(text)
+    assert (c.depth, c.depth_spaced) == (depth, depth_spaced)
+
+
+@pytest.mark.parametrize("text, flag", [
+    ("12/05/2024", "date"),
+    ("12", "page_number"),
+    ("Table 3 results", "table"),
+    ("yes", "table"),
+    ("continued", "stop_word"),
+    ("Coool idea", "repeated_letters"),
+    ("aaaa bbb", "garbled"),
+    ("Hello...!!!", "garbled"),
+])
+def test_flags(text, flag):
+    assert getattr(LINE_CLASSIFIER.classify(text), flag)
+
+
+def test_plain_heading_has_no_flags():
+    c = LINE_CLASSIFIER.classify("Revision History")
+    assert not any((c.garbled, c.repeated_letters, c.table, c.date, c.page_number, c.stop_word))
+
+
+@pytest.mark.parametrize("text", LINES)
+def test_matches_the_per_call_filters(text):
+    # The regex filters the extractors ran before the classifier
+    from benchmarks.bench_classifier import current_classify, legacy_classify
+    assert current_classify(text) == legacy_classify(text)
@@ -0,0 +1,71 @@
+import json
+import os
+
+from manifest import Manifest
+
+
+def _setup(tmp_path):
+    pdf = tmp_path / "in" / "a.pdf"
+    pdf.parent.mkdir()
+    pdf.write_bytes(b"%PDF-1 one")
+    out = tmp_path / "out"
+    out.mkdir()
+    return str(pdf), str(out), str(out / ".manifest.json")
+
+
+def _process(manifest, pdf, out_dir):
+    out_path = os.path.join(out_dir, "a.json")
+    if manifest.check("a.pdf", pdf, out_path):
+        with open(out_path, "w") as f:
+            f.write("{}")
+        manifest.record("a.pdf")
+        return True
+    return False
+
+
+def test_unchanged_input_is_skipped_after_commit(tmp_path):
+    pdf, out, path = _setup(tmp_path)
+    m = Manifest(path, "fp", out)
+    assert _process(m, pdf, out)
+    m.commit()
+    assert not os.path.exists(path + ".journal")
+    assert not _process(Manifest(path, "fp", out), pdf, out)
+    # Another extractor configuration reprocesses everything
+    assert _process(Manifest(path, "other", out), pdf, out)
+
+
+def test_touched_input_is_skipped_and_modified_one_is_not(tmp_path):
+    pdf, out, path = _setup(tmp_path)
+    m = Manifest(path, "fp", out)
+    _process(m, pdf, out)
+    m.commit()
+    st = os.stat(pdf)
+    os.utime(pdf, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert not _process(Manifest(path, "fp", out), pdf, out)
+    with open(pdf, "ab") as f:
+        f.write(b" two")
+    assert _process(Manifest(path, "fp", out), pdf, out)
+
+
+def test_journal_is_replayed_after_an_interrupted_run(tmp_path):
+    pdf, out, path = _setup(tmp_path)
+    _process(Manifest(path, "fp", out), pdf, out)
+    # No commit: the run died. A torn record at the end is ignored
+    with open(path + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"path": "b.pdf", "ent')
+    m = Manifest(path, "fp", out)
+    assert set(m.entries) == {"a.pdf"}
+    assert not _process(m, pdf, out)
+    m.commit()
+    with open(path, encoding="utf-8") as f:
+        assert set(json.load(f)["entries"]) == {"a.pdf"}
+
+
+def test_remove_missing_deletes_outputs_of_deleted_inputs(tmp_path):
+    pdf, out, path = _setup(tmp_path)
+    m = Manifest(path, "fp", out)
+    _process(m, pdf, out)
+    assert m.remove_missing([]) == ["a.pdf"]
+    assert not os.path.exists(os.path.join(out, "a.json"))
+    m.commit()
+    assert Manifest(path, "fp", out).entries == {}
@@ -0,0 +1,56 @@
+"""main() over sample_dataset/pdfs must reproduce sample_dataset/outputs."""
+import json
+import os
+
+import pytest
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_dataset")
+NAMES = sorted(name[:-4] for name in os.listdir(os.path.join(SAMPLES, "pdfs")) if name.endswith(".pdf"))
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def layout_outputs(tmp_path_factory):
+    # The page layout of every document, default backend and settings
+    import process_pdfs
+    out = tmp_path_factory.mktemp("outputs")
+    process_pdfs.main(["--input", os.path.join(SAMPLES, "pdfs"), "--output", str(out), "--no-cache", "--no-toc"])
+    return out
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_main_matches_sample_outputs(layout_outputs, name):
+    got = _load(os.path.join(layout_outputs, name + ".json"))
+    assert got == _load(os.path.join(SAMPLES, "outputs", name + ".json"))
+
+
+@pytest.fixture(scope="module")
+def default_outputs(tmp_path_factory):
+    # As the Docker image runs it: bookmarks are used where they check out
+    import process_pdfs
+    out = tmp_path_factory.mktemp("default")
+    process_pdfs.main(["--input", os.path.join(SAMPLES, "pdfs"), "--output", str(out), "--no-cache"])
+    return out
+
+
+def _alnum(text):
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_headings_are_on_their_output_page(default_outputs, name):
+    # Whichever path produced it, a heading written as page p starts on
+    # physical page p + 1 (process_pdfs.output_page), or on page 1 when p is
+    # 1. Merged headings can join lines that are not adjacent in the page
+    # text, so only the start of the heading is looked up
+    import fitz
+    outline = _load(os.path.join(default_outputs, name + ".json"))["outline"]
+    with fitz.open(os.path.join(SAMPLES, "pdfs", name + ".pdf")) as doc:
+        for heading in outline:
+            pages = [p for p in ({0, 1} if heading["page"] == 1 else {heading["page"]}) if p < len(doc)]
+            text = "".join(_alnum(doc[p].get_text("text")) for p in sorted(pages))
+            assert _alnum(heading["text"])[:12] in text, heading
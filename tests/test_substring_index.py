@@ -0,0 +1,48 @@
+import random
+from collections import namedtuple
+
+from substring_index import SubstringIndex, drop_contained_on_page
+
+
+def _brute_related(texts, q):
+    return [k for k, t in enumerate(texts) if t in q or q in t]
+
+
+def test_overlaps_both_ways():
+    index = SubstringIndex()
+    index.add("introduction to testing")
+    index.add("ab")
+    assert index.overlaps("introduction")                       # q inside a stored text
+    assert index.overlaps("1. introduction to testing today")   # a stored text inside q
+    assert index.overlaps("cab")                                # short stored text inside q
+    assert not index.overlaps("summary")
+    assert not SubstringIndex().overlaps("anything")
+
+
+def test_related_matches_brute_force():
+    rng = random.Random(7)
+    texts = ["".join(rng.choice("abc ") for _ in range(rng.randint(1, 12))) for _ in range(200)]
+    index = SubstringIndex()
+    for t in texts:
+        index.add(t)
+    for q in texts[:50] + ["".join(rng.choice("abc") for _ in range(rng.randint(1, 6))) for _ in range(50)]:
+        assert index.related(q) == _brute_related(texts, q)
+        assert index.overlaps(q) == bool(_brute_related(texts, q))
+
+
+def test_update_extends_the_last_text_and_rebuilds_others():
+    index = SubstringIndex()
+    first = index.add("overview")
+    last = index.add("2.1 sc")
+    index.update(last, "2.1 scope of work")
+    assert index.overlaps("scope of work")
+    index.update(first, "summary")
+    assert not index.overlaps("overview")
+    assert index.related("summary") == [first]
+    assert index.related("2.1 scope of work") == [last]
+
+
+def test_drop_contained_on_page_keeps_the_longest_per_page():
+    Item = namedtuple("Item", "page text")
+    items = [Item(1, "Goals"), Item(1, "Goals and Scope"), Item(2, "Goals"), Item(2, "Budget")]
+    assert drop_contained_on_page(items) == [Item(1, "Goals and Scope"), Item(2, "Goals"), Item(2, "Budget")]